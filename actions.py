@@ -1,11 +1,66 @@
 from googleapiclient.errors import HttpError
+from request_executor import RequestExecutor
+from tool_schema import IsoDateTime
+from mime import extract_body
+from free_busy import BusyIndex, parse_time
 from email.mime.text import MIMEText
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pydantic import BaseModel
+from typing import Optional
+import contextvars
 import base64
 import datetime
+import html
+import time
+
+
+# one long-lived pool for page prefetches: the Google clients keep an httplib2 transport per thread,
+# so reusing the threads reuses their open connections instead of opening one per listing
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='page-prefetch')
+
+
+def iter_pages(fetch_page):
+    """Yield items from a paginated Google listing, one page at a time.
+
+    fetch_page(page_token) must return (items, next_page_token). The next page is fetched on a
+    background thread while the caller consumes the current one, so at most two pages are held in
+    memory. Closing the generator early stops pagination. An HttpError that outlasts the executor's
+    retries is raised to the caller rather than ending the listing early as if it were complete.
+    """
+    context = contextvars.copy_context()  # page requests are traced under the caller's span
+    future = _prefetch_executor.submit(context.run, fetch_page, None)
+    try:
+        while future is not None:
+            items, next_page_token = future.result()
+            future = _prefetch_executor.submit(context.run, fetch_page, next_page_token) if next_page_token else None
+            yield from items
+    finally:
+        if future is not None:
+            future.cancel()
+
+
+# headers requested by metadata listings, the only ones _parse_message reads
+METADATA_HEADERS = ['Subject', 'From', 'Date']
+
+
+# Gmail accepts at most this many ids per batchModify request
+BULK_CHUNK_SIZE = 1000
+SYSTEM_LABELS = {'INBOX', 'SPAM', 'TRASH', 'UNREAD', 'STARRED', 'IMPORTANT', 'SENT', 'DRAFT'}
+
 
 class GmailActions:
-    def __init__(self, gmail_service):
+    # Gmail accepts up to 100 calls per batch request but recommends staying at or below 50
+    # store is an optional MessageStore, synced at most once every max_age seconds
+    # executor rate limits and retries every request, see request_executor.RequestExecutor
+    def __init__(self, gmail_service, batch_size=50, store=None, max_age=60, executor=None, max_body_bytes=32000):
         self.service = gmail_service
+        self.batch_size = batch_size
+        self.store = store
+        self.max_age = max_age
+        self.max_body_bytes = max_body_bytes  # per message, see mime.extract_body
+        self.label_ids = None  # label name -> id, loaded on first use by batch_label
+        self.executor = executor or RequestExecutor.for_gmail()
 
 
     # def handle_gmail_action(gmail_actions, action, action_data):
@@ -21,106 +76,354 @@ class GmailActions:
     #         print(f"From: {message['sender']}")
     #         print(f"Body: {message['body'][:100]}...")  # Print first 100 characters of the body
     #         print("-" * 50)
-    def list_messages(self, max_results=100, query=None):
+    def list_messages(self, max_results: int = 100, query: Optional[str] = None):
+        """List emails newest first with subject, sender, date and a short snippet.
+        Use get_message to read the full body of a specific email."""
         print("calling tool list_messages")
-        try:
-            response = self.service.users().messages().list(userId='me', maxResults=max_results, q=query).execute()
-            messages = response.get('messages', [])
-            
-            detailed_messages = []
-            for message in messages:
-                msg_details = self.get_message(message['id'])
-                detailed_messages.append(msg_details)
-            
-            for message in detailed_messages:
-                print(f"ID: {message['id']}")
-                print(f"Thread ID: {message['threadId']}")
-                print(f"Subject: {message['subject']}")
-                print(f"From: {message['sender']}")
-                print(f"Body: {message['body'][:100]}...")  # Print first 100 characters of the body
-                print("-" * 50)
-                # print(messages.content[0].type)
-            return "success"
+        # Gmail returns at most 500 ids per page, iter_messages follows nextPageToken past that
+        stubs = islice(self.iter_messages(query=query, page_size=min(max_results, 500), hydrate=False), max_results)
+        try:  # listings only need headers and a snippet, get_message fetches the body when it is asked for
+            return self.get_messages([stub['id'] for stub in stubs], format='metadata')
         except HttpError as error:
+            # an empty list would read as "no emails" to the model
             print(f'An error occurred: {error}')
-            return []
+            return f"Gmail request failed after retries: {error}"
 
-    def get_message(self, message_id):
-        try:
-            message = self.service.users().messages().get(userId='me', id=message_id, format='full').execute()
-            
-            headers = message['payload']['headers']
-            subject = next((header['value'] for header in headers if header['name'].lower() == 'subject'), 'No Subject')
-            sender = next((header['value'] for header in headers if header['name'].lower() == 'from'), 'Unknown Sender')
-            
-            if 'parts' in message['payload']:
-                parts = message['payload']['parts']
-                body = self.get_body_from_parts(parts)
+    def iter_messages(self, query=None, page_size=100, hydrate=True):
+        """Lazily yield messages matching query across all result pages.
+
+        With hydrate=False only the {'id', 'threadId'} stubs from messages().list are yielded.
+        """
+        def fetch_page(page_token):
+            response = self.executor.execute(self.service.users().messages().list(
+                userId='me', maxResults=page_size, q=query, pageToken=page_token))
+            messages = response.get('messages', [])
+            if hydrate:
+                messages = self.get_messages([message['id'] for message in messages])
+            return messages, response.get('nextPageToken')
+
+        return iter_pages(fetch_page)
+
+    def get_messages(self, message_ids, format='full'):
+        """Fetch many messages through the Gmail batch endpoint, preserving the order of message_ids.
+
+        format='metadata' fetches only the Subject/From/Date headers and Gmail's snippet, which is a
+        fraction of the bytes of a full message; those come back with a 'snippet' instead of a 'body'.
+        A message that fails to load is returned as {'id': ..., 'error': ...} instead of failing the whole batch.
+        """
+        results = self._cached_messages(message_ids, full=format == 'full')
+        missing = [message_id for message_id in message_ids if message_id not in results]
+        fetched = []
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                print(f'An error occurred fetching message {request_id}: {exception}')
+                results[request_id] = {'id': request_id, 'error': str(exception)}
             else:
-                body = self.decode_body(message['payload']['body'])
-            
-            return {
-                'id': message['id'],
-                'threadId': message['threadId'],
-                'subject': subject,
-                'sender': sender,
-                'body': body
+                results[request_id] = self._parse_message(response, format)
+                fetched.append(results[request_id])
+
+        for start in range(0, len(missing), self.batch_size):
+            requests = {
+                message_id: self._get_request(message_id, format)
+                for message_id in missing[start:start + self.batch_size]
             }
+            self.executor.execute_batch(self.service, requests, callback)
+
+        if self.store is not None and fetched:
+            self.store.put_many(fetched)
+
+        return [results[message_id] for message_id in message_ids if message_id in results]
+
+    def get_message(self, message_id: str):
+        cached = self._cached_messages([message_id], full=True)
+        if message_id in cached:
+            return cached[message_id]
+        try:
+            message = self.executor.execute(self._get_request(message_id, 'full'))
+            parsed = self._parse_message(message)
+            if self.store is not None:
+                self.store.put_many([parsed])
+            return parsed
         except HttpError as error:
             print(f'An error occurred: {error}')
             return None
 
-    def get_body_from_parts(self, parts):
-        for part in parts:
-            if part['mimeType'] == 'text/plain':
-                return self.decode_body(part['body'])
-            elif 'parts' in part:
-                return self.get_body_from_parts(part['parts'])
-        return ''
+    def search_local(self, query: str, limit: int = 10):
+        """Search the locally cached emails by subject, sender and body, best match first.
+        Works offline and only covers emails that were already listed or opened.
+        Supports words, "exact phrases", OR, NOT and prefix* terms, e.g. invoice OR receipt."""
+        if self.store is None:
+            return "Local search is unavailable, no message store is configured."
+        return self.store.search(query, limit=int(limit))
+
+    def _get_request(self, message_id, format):
+        if format == 'metadata':
+            return self.service.users().messages().get(userId='me', id=message_id, format='metadata',
+                                                       metadataHeaders=METADATA_HEADERS)
+        return self.service.users().messages().get(userId='me', id=message_id, format=format)
 
-    def decode_body(self, body):
-        if 'data' in body:
-            return base64.urlsafe_b64decode(body['data']).decode('utf-8')
-        return ''
+    def _cached_messages(self, message_ids, full=False):
+        """Serve message_ids from the local store, syncing it first if it is older than max_age.
 
-    def send_message(self, to, subject, body, user_id='me'):
+        With full=True, messages cached from a metadata listing count as missing.
+        """
+        if self.store is None:
+            return {}
+        if not self.store.is_fresh(self.max_age):
+            self.store.sync(self.service, self.executor)
+        return self.store.get_many(message_ids, full=full)
+
+    def _parse_message(self, message, format='full'):
+        headers = message['payload']['headers']
+        subject = next((header['value'] for header in headers if header['name'].lower() == 'subject'), 'No Subject')
+        sender = next((header['value'] for header in headers if header['name'].lower() == 'from'), 'Unknown Sender')
+        date = next((header['value'] for header in headers if header['name'].lower() == 'date'), None)
+
+        parsed = {
+            'id': message['id'],
+            'threadId': message['threadId'],
+            'subject': subject,
+            'sender': sender,
+            'date': date,
+        }
+        if format == 'full':
+            parsed['body'] = extract_body(message['payload'], self.max_body_bytes)
+        else:  # metadata responses carry headers only
+            parsed['snippet'] = html.unescape(message.get('snippet', ''))
+        return parsed
+
+    def send_message(self, to: str, subject: str, body: str, user_id: str = 'me'):
         try:
             message = MIMEText(body)
             message['to'] = to
             message['subject'] = subject
             raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
             
-            message = self.service.users().messages().send(userId=user_id, body={'raw': raw_message}).execute()
+            message = self.executor.execute(self.service.users().messages().send(userId=user_id, body={'raw': raw_message}))
             return message
         except HttpError as error:
             print(f'An error occurred: {error}')
             return None
 
-    def delete_message(self, message_id, user_id='me'):
+    def delete_message(self, message_id: str, user_id: str = 'me'):
         try:
-            self.service.users().messages().delete(userId=user_id, id=message_id).execute()
+            self.executor.execute(self.service.users().messages().delete(userId=user_id, id=message_id))
+            if self.store is not None:
+                self.store.delete_many([message_id])
             return True
         except HttpError as error:
             print(f'An error occurred: {error}')
             return False
 
+    def batch_delete(self, ids: Optional[list[str]] = None, query: Optional[str] = None, dry_run: bool = True):
+        """Move many emails to the trash at once, given their ids or a Gmail search query.
+        dry_run (the default) only reports how many emails match with a few examples; call again
+        with dry_run=false to trash them."""
+        try:
+            message_ids = self._resolve_ids(ids, query)
+        except HttpError as error:
+            print(f'An error occurred: {error}')
+            return f"Gmail request failed after retries: {error}"
+        if dry_run or not message_ids:
+            return self._preview(message_ids)
+        # batchModify into TRASH works with the gmail.modify scope, batchDelete would need full mail access
+        return self._bulk(message_ids, {'addLabelIds': ['TRASH'], 'removeLabelIds': ['INBOX']}, evict=True)
+
+    def batch_label(self, ids: list[str], add: Optional[list[str]] = None, remove: Optional[list[str]] = None,
+                    dry_run: bool = False):
+        """Add and/or remove labels on many emails at once. Labels are names such as STARRED, UNREAD,
+        INBOX or a user label's name. With dry_run only the number of affected emails is reported."""
+        if not add and not remove:
+            return "Nothing to do, pass labels to add and/or remove."
+        try:
+            body = {'addLabelIds': self._resolve_labels(add or []), 'removeLabelIds': self._resolve_labels(remove or [])}
+        except (HttpError, KeyError) as error:
+            return f"Could not resolve labels: {error}"
+        message_ids = list(dict.fromkeys(ids))
+        if dry_run or not message_ids:
+            return self._preview(message_ids)
+        return self._bulk(message_ids, body)
+
+    def archive(self, query: str, dry_run: bool = False):
+        """Archive (remove from the inbox) every inbox email matching a Gmail search query, e.g.
+        "category:promotions older_than:30d". With dry_run only the matches are counted."""
+        try:
+            message_ids = self._resolve_ids(None, f"in:inbox {query}")
+        except HttpError as error:
+            print(f'An error occurred: {error}')
+            return f"Gmail request failed after retries: {error}"
+        if dry_run or not message_ids:
+            return self._preview(message_ids)
+        return self._bulk(message_ids, {'removeLabelIds': ['INBOX']})
+
+    def _resolve_ids(self, ids, query):
+        if ids:
+            return list(dict.fromkeys(ids))
+        if not query:
+            return []
+        return [stub['id'] for stub in self.iter_messages(query=query, page_size=500, hydrate=False)]
+
+    def _resolve_labels(self, names):
+        resolved = []
+        for name in names:
+            if name.upper() in SYSTEM_LABELS or name.upper().startswith('CATEGORY_'):
+                resolved.append(name.upper())
+                continue
+            if self.label_ids is None:
+                labels = self.executor.execute(self.service.users().labels().list(userId='me')).get('labels', [])
+                self.label_ids = {label['name'].lower(): label['id'] for label in labels}
+                self.label_ids.update({label['id'].lower(): label['id'] for label in labels})
+            resolved.append(self.label_ids[name.lower()])
+        return resolved
+
+    def _preview(self, message_ids, sample_size=5):
+        try:
+            sample = self.get_messages(message_ids[:sample_size], format='metadata') if message_ids else []
+        except HttpError as error:  # the count is still worth reporting without examples
+            print(f'An error occurred: {error}')
+            sample = []
+        return {
+            'dry_run': True,
+            'count': len(message_ids),
+            'sample': [{key: message.get(key) for key in ('id', 'subject', 'sender', 'date')} for message in sample],
+        }
+
+    def _bulk(self, message_ids, body, evict=False):
+        """Apply a batchModify body to message_ids in chunks of BULK_CHUNK_SIZE.
+
+        With evict the messages are also dropped from the local store.
+        """
+        done = 0
+        for start in range(0, len(message_ids), BULK_CHUNK_SIZE):
+            chunk = message_ids[start:start + BULK_CHUNK_SIZE]
+            request = self.service.users().messages().batchModify(userId='me', body={**body, 'ids': chunk})
+            try:
+                self.executor.execute(request)
+            except HttpError as error:
+                print(f'An error occurred: {error}')
+                return {'count': done, 'failed': len(message_ids) - done, 'error': str(error)}
+            if evict and self.store is not None:
+                self.store.delete_many(chunk)
+            done += len(chunk)
+        return {'count': done}
+
+
+class NewEvent(BaseModel):
+    summary: str
+    start_time: IsoDateTime
+    end_time: IsoDateTime
+    description: Optional[str] = None
+    location: Optional[str] = None
+
+
+class EventChanges(BaseModel):
+    event_id: str
+    summary: Optional[str] = None
+    start_time: Optional[IsoDateTime] = None
+    end_time: Optional[IsoDateTime] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+
+
+def _event_fields(summary=None, start_time=None, end_time=None, description=None, location=None):
+    """Calendar event body holding only the given fields, times in UTC like create_event."""
+    fields = {'summary': summary, 'description': description, 'location': location}
+    body = {key: value for key, value in fields.items() if value is not None}
+    if start_time is not None:
+        body['start'] = {'dateTime': start_time, 'timeZone': 'UTC'}
+    if end_time is not None:
+        body['end'] = {'dateTime': end_time, 'timeZone': 'UTC'}
+    return body
+
+
 class CalendarActions:
-    def __init__(self, calendar_service):
+    def __init__(self, calendar_service, executor=None, busy_max_age=60):
         self.service = calendar_service
+        self.executor = executor or RequestExecutor.for_calendar()
+        self.busy_max_age = busy_max_age
+        self.busy = {}  # calendar id -> (fetched_at, time_min, time_max, BusyIndex)
 
-    def list_events(self, calendar_id='primary', max_results=100, time_min=None):
+    def list_events(self, calendar_id: str = 'primary', max_results: int = 100,
+                    time_min: Optional[IsoDateTime] = None):
+        # Calendar returns at most 2500 events per page, iter_events follows nextPageToken past that
         try:
-            if not time_min:
-                time_min = datetime.datetime.utcnow().isoformat() + 'Z'
-            events_result = self.service.events().list(calendarId=calendar_id, timeMin=time_min,
-                                                       maxResults=max_results, singleEvents=True,
-                                                       orderBy='startTime').execute()
-            return events_result.get('items', [])
+            return list(islice(self.iter_events(calendar_id=calendar_id, time_min=time_min,
+                                                page_size=min(max_results, 2500)), max_results))
+        except HttpError as error:
+            print(f'An error occurred: {error}')
+            return f"Calendar request failed after retries: {error}"
+
+    def iter_events(self, calendar_id='primary', time_min=None, page_size=250):
+        """Lazily yield upcoming events ordered by start time across all result pages."""
+        if not time_min:
+            time_min = datetime.datetime.utcnow().isoformat() + 'Z'
+
+        def fetch_page(page_token):
+            events_result = self.executor.execute(self.service.events().list(
+                calendarId=calendar_id, timeMin=time_min, maxResults=page_size, singleEvents=True,
+                orderBy='startTime', pageToken=page_token))
+            return events_result.get('items', []), events_result.get('nextPageToken')
+
+        return iter_pages(fetch_page)
+
+    def find_free_slots(self, attendees: list[str], window_start: IsoDateTime, window_end: IsoDateTime,
+                        duration_minutes: int = 30, max_slots: int = 10, include_me: bool = True):
+        """Find times between window_start and window_end when every attendee (email or calendar id) and,
+        unless include_me is false, the user are free for at least duration_minutes.
+        Returns up to max_slots free ranges, earliest first; a meeting fits anywhere inside a range."""
+        start, end = parse_time(window_start), parse_time(window_end)
+        if end <= start:
+            return "window_end must be after window_start"
+        calendar_ids = list(dict.fromkeys((['primary'] if include_me else []) + list(attendees)))
+        try:
+            indexes, errors = self.busy_indexes(calendar_ids, start, end)
         except HttpError as error:
             print(f'An error occurred: {error}')
             return None
 
-    def create_event(self, summary, start_time, end_time, description=None, location=None, calendar_id='primary'):
+        gaps = BusyIndex.union(indexes.values()).free(start, end, datetime.timedelta(minutes=duration_minutes))
+        result = {'slots': [{'start': gap_start.isoformat(), 'end': gap_end.isoformat()}
+                            for gap_start, gap_end in islice(gaps, max_slots)]}
+        if errors:  # e.g. calendars outside the user's domain that do not share free/busy
+            result['unavailable'] = errors
+        return result
+
+    def busy_indexes(self, calendar_ids, start, end):
+        """Return ({calendar id: BusyIndex}, {calendar id: error}) covering [start, end).
+
+        Indexes fetched within busy_max_age seconds that cover the range are reused, the rest come
+        from freebusy().query, at most 50 calendars per request.
+        """
+        now = time.time()
+        indexes = {}
+        errors = {}
+        missing = []
+        for calendar_id in calendar_ids:
+            cached = self.busy.get(calendar_id)
+            if cached and now - cached[0] < self.busy_max_age and cached[1] <= start and end <= cached[2]:
+                indexes[calendar_id] = cached[3]
+            else:
+                missing.append(calendar_id)
+
+        for chunk in range(0, len(missing), 50):
+            response = self.executor.execute(self.service.freebusy().query(body={
+                'timeMin': start.isoformat(),
+                'timeMax': end.isoformat(),
+                'items': [{'id': calendar_id} for calendar_id in missing[chunk:chunk + 50]],
+            }))
+            for calendar_id, calendar in response.get('calendars', {}).items():
+                if calendar.get('errors'):
+                    errors[calendar_id] = ", ".join(error.get('reason', 'unknown') for error in calendar['errors'])
+                    continue
+                index = BusyIndex((parse_time(busy['start']), parse_time(busy['end']))
+                                  for busy in calendar.get('busy', []))
+                self.busy[calendar_id] = (now, start, end, index)
+                indexes[calendar_id] = index
+        return indexes, errors
+
+    def create_event(self, summary: str, start_time: IsoDateTime, end_time: IsoDateTime, description: Optional[str] = None,
+                     location: Optional[str] = None, calendar_id: str = 'primary'):
         event = {
             'summary': summary,
             'location': location,
@@ -136,36 +439,85 @@ class CalendarActions:
         }
 
         try:
-            event = self.service.events().insert(calendarId=calendar_id, body=event).execute()
+            event = self.executor.execute(self.service.events().insert(calendarId=calendar_id, body=event))
+            if calendar_id in self.busy:  # keep the cached free/busy index current
+                self.busy[calendar_id][3].add(parse_time(start_time), parse_time(end_time))
             return event
         except HttpError as error:
             print(f'An error occurred: {error}')
             return None
 
-    def update_event(self, event_id, summary=None, start_time=None, end_time=None, description=None, location=None, calendar_id='primary'):
+    def update_event(self, event_id: str, summary: Optional[str] = None, start_time: Optional[IsoDateTime] = None,
+                     end_time: Optional[IsoDateTime] = None, description: Optional[str] = None,
+                     location: Optional[str] = None, calendar_id: str = 'primary'):
+        # a patch sends only the changed fields and needs no GET of the current event
+        changes = _event_fields(summary, start_time, end_time, description, location)
         try:
-            event = self.service.events().get(calendarId=calendar_id, eventId=event_id).execute()
-            
-            if summary:
-                event['summary'] = summary
-            if start_time:
-                event['start']['dateTime'] = start_time
-            if end_time:
-                event['end']['dateTime'] = end_time
-            if description:
-                event['description'] = description
-            if location:
-                event['location'] = location
-
-            updated_event = self.service.events().update(calendarId=calendar_id, eventId=event_id, body=event).execute()
+            updated_event = self.executor.execute(
+                self.service.events().patch(calendarId=calendar_id, eventId=event_id, body=changes))
+            self.busy.pop(calendar_id, None)
             return updated_event
         except HttpError as error:
             print(f'An error occurred: {error}')
             return None
 
-    def delete_event(self, event_id, calendar_id='primary'):
+    def create_events(self, events: list[NewEvent], calendar_id: str = 'primary'):
+        """Create many events in one request, e.g. a week of recurring meetings.
+        Returns one entry per event in the same order: the created event or an {'error': ...}."""
+        requests = {
+            str(index): self.service.events().insert(calendarId=calendar_id, body=_event_fields(
+                event.summary, event.start_time, event.end_time, event.description, event.location))
+            for index, event in enumerate(NewEvent.model_validate(event) for event in events)
+        }
+        results = self._execute_batch(requests)
+        if calendar_id in self.busy:
+            for event in results:
+                if 'error' not in event:
+                    self.busy[calendar_id][3].add(parse_time(event['start']['dateTime']),
+                                                  parse_time(event['end']['dateTime']))
+        return results
+
+    def update_events(self, updates: list[EventChanges], calendar_id: str = 'primary'):
+        """Change many events in one request; each update names an event_id and only the fields to change.
+        Returns one entry per update in the same order: the updated event or an {'error': ...}."""
+        updates = [EventChanges.model_validate(update) for update in updates]
+        requests = {
+            str(index): self.service.events().patch(calendarId=calendar_id, eventId=update.event_id, body=_event_fields(
+                update.summary, update.start_time, update.end_time, update.description, update.location))
+            for index, update in enumerate(updates)
+        }
+        results = self._execute_batch(requests)
+        self.busy.pop(calendar_id, None)
+        return results
+
+    def _execute_batch(self, requests, batch_size=50):
+        """Run {str(index): request} through Google batch requests and return the outcomes by index."""
+        results = [None] * len(requests)
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                print(f'An error occurred in batch item {request_id}: {exception}')
+                results[int(request_id)] = {'error': str(exception)}
+            else:
+                results[int(request_id)] = response
+
+        items = list(requests.items())
+        error = 'not sent'
+        for start in range(0, len(items), batch_size):
+            try:
+                self.executor.execute_batch(self.service, dict(items[start:start + batch_size]), callback)
+            except HttpError as batch_error:  # the whole batch failed, its items report that error
+                print(f'An error occurred: {batch_error}')
+                error = str(batch_error)
+                for index in range(start, min(start + batch_size, len(items))):
+                    if results[index] is None:
+                        results[index] = {'error': error}
+        return [result if result is not None else {'error': error} for result in results]
+
+    def delete_event(self, event_id: str, calendar_id: str = 'primary'):
         try:
-            self.service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+            self.executor.execute(self.service.events().delete(calendarId=calendar_id, eventId=event_id))
+            self.busy.pop(calendar_id, None)
             return True
         except HttpError as error:
             print(f'An error occurred: {error}')
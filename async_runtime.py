@@ -0,0 +1,116 @@
+from main import Agent, Response, agents, attach_tools, execute_tool_call, tool_executor, tool_results, router, \
+    triage_agent
+from session_store import SessionStore
+from tracing import tracer
+from tool_schema import decode_arguments
+from openai import AsyncOpenAI
+from context_budget import ContextWindow
+import asyncio
+import contextvars
+import inspect
+import json
+import os
+
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+async def run_full_turn_async(agent, messages, context=None, result_store=None):
+    """Async twin of main.run_full_turn, so one event loop can drive many sessions at once.
+
+    Coroutine tools are awaited directly; regular tools (GmailActions/CalendarActions methods) run
+    on main.tool_executor so their blocking .execute() calls never stall the loop. Tool calls of one
+    model turn run concurrently and their results are appended in tool_call order.
+    """
+    with tracer.span("turn", agent=agent.name, history=len(messages)):
+        current_agent = agent
+        num_init_messages = len(messages)
+        messages = messages.copy()
+
+        while True:
+            tool_schemas, tools = current_agent.compile_tools()
+            request_messages = context.fit(messages) if context is not None else messages
+
+            # === 1. get openai completion ===
+            with tracer.span("model_call", agent=current_agent.name, model=current_agent.model,
+                             messages=len(request_messages), tools=len(tool_schemas)) as model_span:
+                response = await async_client.chat.completions.create(
+                    model=current_agent.model,
+                    messages=[{"role": "system", "content": current_agent.instructions}]
+                    + request_messages,
+                    tools=tool_schemas or None,
+                )
+                message = response.choices[0].message
+                if response.usage is not None:
+                    model_span.set(prompt_tokens=response.usage.prompt_tokens,
+                                   completion_tokens=response.usage.completion_tokens)
+            messages.append(message)
+
+            if message.content:  # print agent response
+                print(f"{current_agent.name}:", message.content)
+
+            if not message.tool_calls:  # if finished handling tool calls, break
+                break
+
+            # === 2. handle tool calls ===
+            results = await asyncio.gather(
+                *(execute_tool_call_async(tool_call, tools, current_agent.name) for tool_call in message.tool_calls)
+            )
+
+            for tool_call, result in zip(message.tool_calls, results):
+                if isinstance(result, Agent):  # if agent transfer, update current agent
+                    with tracer.span("handoff", from_agent=current_agent.name, to_agent=result.name):
+                        current_agent = result
+                    result = f"Transfered to {current_agent.name}. Adopt persona immediately."
+                elif result_store is not None:  # project and cap large Google payloads
+                    result = result_store.compact(tool_call.function.name, result)
+                elif not isinstance(result, str):  # tool message content must be a string
+                    result = json.dumps(result, default=str)
+
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "content": result,
+                })
+
+        # ==== 3. return last agent used and new messages =====
+        return Response(agent=current_agent, messages=messages[num_init_messages:])
+
+
+async def execute_tool_call_async(tool_call, tools, agent_name):
+    tool = tools.get(tool_call.function.name)
+    if not inspect.iscoroutinefunction(tool):  # unknown tools are reported by execute_tool_call too
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()  # keep the turn's trace span as the parent
+        return await loop.run_in_executor(tool_executor, context.run, execute_tool_call, tool_call, tools, agent_name)
+
+    try:
+        args = decode_arguments(tool, tool_call.function.arguments)
+    except ValueError as error:
+        print(f"{agent_name}:", error)
+        return str(error)
+    print(f"{agent_name}:", f"{tool_call.function.name}({args})")
+    with tracer.span("tool_call", tool=tool_call.function.name, agent=agent_name):
+        return await tool(**args)
+
+
+async def main():
+    attach_tools()
+
+    session = SessionStore(os.getenv("SESSION_DB", "sessions.db")).open(os.getenv("SESSION_ID"),
+                                                                       triage_agent.name)
+    agent = agents.get(session.agent_name, triage_agent)  # Start with Triage agent
+    messages = session.messages
+    print(f"Session {session.id} ({len(messages)} messages)")
+    context = ContextWindow()
+
+    while True:
+        user = await asyncio.to_thread(input, "User: ")
+        agent = router.route(user, agent) or triage_agent
+        session.append([{"role": "user", "content": user}], agent.name)
+
+        response = await run_full_turn_async(agent, messages, context=context, result_store=tool_results)
+        agent = response.agent
+        session.append(response.messages, agent.name)
+
+if __name__ == "__main__":
+    asyncio.run(main())
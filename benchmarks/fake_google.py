@@ -0,0 +1,303 @@
+"""In-memory stand-ins for the Gmail v1 and Calendar v3 services used by actions.py.
+
+Only the surface GmailActions, CalendarActions and MessageStore touch is implemented. Every
+execute() (and every batch, which is one HTTP round trip) sleeps for `latency` seconds and is
+counted in `stats`, so benchmarks can report how many requests a scenario needed.
+"""
+from googleapiclient.errors import HttpError
+import base64
+import datetime
+import httplib2
+import itertools
+import json
+import threading
+import time
+
+
+def _http_error(status, message):
+    content = json.dumps({"error": {"code": status, "message": message}}).encode()
+    return HttpError(httplib2.Response({"status": status}), content)
+
+
+class FakeRequest:
+    def __init__(self, backend, method_id, call):
+        self.backend = backend
+        self.methodId = method_id
+        self.call = call
+
+    def execute(self, http=None, num_retries=0):
+        self.backend.round_trip(self.methodId)
+        return self.call()
+
+
+class FakeBatch:
+    def __init__(self, backend, callback):
+        self.backend = backend
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None, callback=None):
+        self.requests.append((request_id, request, callback or self.callback))
+
+    def execute(self, http=None):
+        self.backend.round_trip("batch", calls=len(self.requests))
+        for request_id, request, callback in self.requests:
+            try:
+                response, exception = request.call(), None
+            except HttpError as error:
+                response, exception = None, error
+            callback(request_id, response, exception)
+
+
+class FakeBackend:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.stats = {"round_trips": 0, "calls": 0}
+
+    def round_trip(self, method_id, calls=1):
+        with self.lock:
+            self.stats["round_trips"] += 1
+            self.stats["calls"] += calls
+            self.stats[method_id] = self.stats.get(method_id, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+
+class _Resource:
+    """Lets service.users().messages() style chains resolve to plain methods."""
+
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+
+def _encode(text):
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+class FakeGmailService(FakeBackend):
+    def __init__(self, messages=(), latency=0.0):
+        super().__init__(latency)
+        self.messages = {}
+        self.history = []  # (history_id, deleted message id)
+        self.history_ids = itertools.count(1000)
+        self.history_id = next(self.history_ids)
+        for message in messages:
+            self.add_message(**message)
+
+    @classmethod
+    def with_inbox(cls, count, latency=0.0, body_size=2000):
+        filler = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. "
+        return cls(
+            [
+                {
+                    "subject": f"{'Invoice' if i % 7 == 0 else 'Update'} #{i}",
+                    "sender": f"sender{i % 13}@example.com",
+                    "body": (f"Message {i}. " + filler * (body_size // len(filler) + 1))[:body_size],
+                }
+                for i in range(count)
+            ],
+            latency=latency,
+        )
+
+    def add_message(self, subject, sender, body, message_id=None):
+        message_id = message_id or f"m{len(self.messages):06d}"
+        self.messages[message_id] = {
+            "id": message_id,
+            "threadId": f"t{message_id}",
+            "labelIds": ["INBOX"],
+            "snippet": body[:100],
+            "historyId": str(self.history_id),
+            "internalDate": str(int(time.time() * 1000) - len(self.messages)),
+            "payload": {
+                "mimeType": "multipart/alternative",
+                "headers": [
+                    {"name": "Subject", "value": subject},
+                    {"name": "From", "value": sender},
+                    {"name": "Date", "value": "Mon, 1 Jan 2024 09:00:00 +0000"},
+                ],
+                "body": {"size": 0},
+                "parts": [
+                    {"mimeType": "text/plain", "headers": [], "body": {"size": len(body), "data": _encode(body)}},
+                    {"mimeType": "text/html", "headers": [],
+                     "body": {"size": len(body) + 13, "data": _encode(f"<p>{body}</p>")}},
+                ],
+            },
+        }
+        return message_id
+
+    def _matches(self, message, query):
+        if not query:
+            return True
+        headers = " ".join(header["value"] for header in message["payload"]["headers"])
+        text = (headers + " " + message["snippet"]).lower()
+        return all(term.lower() in text for term in query.split() if ":" not in term)
+
+    def _delete(self, message_id):
+        if self.messages.pop(message_id, None) is not None:
+            self.history_id = next(self.history_ids)
+            self.history.append((self.history_id, message_id))
+
+    def _get(self, id, format="full", metadataHeaders=None, **kwargs):
+        if id not in self.messages:
+            raise _http_error(404, "Requested entity was not found.")
+        message = self.messages[id]
+        if format == "metadata":
+            headers = [
+                header for header in message["payload"]["headers"]
+                if not metadataHeaders or header["name"] in metadataHeaders
+            ]
+            return {**message, "payload": {"mimeType": message["payload"]["mimeType"], "headers": headers}}
+        if format == "minimal":
+            return {key: value for key, value in message.items() if key != "payload"}
+        return message
+
+    def _list(self, maxResults=100, q=None, pageToken=None, **kwargs):
+        ids = sorted((message_id for message_id, message in self.messages.items() if self._matches(message, q)),
+                     reverse=True)
+        start = int(pageToken or 0)
+        page = ids[start:start + maxResults]
+        response = {"messages": [{"id": message_id, "threadId": f"t{message_id}"} for message_id in page],
+                    "resultSizeEstimate": len(ids)}
+        if start + maxResults < len(ids):
+            response["nextPageToken"] = str(start + maxResults)
+        return response
+
+    def _send(self, body, **kwargs):
+        raw = base64.urlsafe_b64decode(body["raw"]).decode(errors="replace")
+        return {"id": self.add_message("(sent)", "me", raw), "labelIds": ["SENT"]}
+
+    def _batch_modify(self, body, **kwargs):
+        for message_id in body.get("ids", []):
+            message = self.messages.get(message_id)
+            if message is None:
+                continue
+            labels = [label for label in message["labelIds"] if label not in body.get("removeLabelIds", [])]
+            message["labelIds"] = labels + [label for label in body.get("addLabelIds", []) if label not in labels]
+        return ""
+
+    def _batch_delete(self, body, **kwargs):
+        for message_id in body.get("ids", []):
+            self._delete(message_id)
+        return ""
+
+    def _labels(self, **kwargs):
+        names = sorted({label for message in self.messages.values() for label in message["labelIds"]} | {"INBOX"})
+        return {"labels": [{"id": name if name.isupper() else f"Label_{name}", "name": name} for name in names]}
+
+    def _history(self, startHistoryId, pageToken=None, **kwargs):
+        deleted = [message_id for history_id, message_id in self.history if history_id > int(startHistoryId)]
+        return {
+            "history": [{"messagesDeleted": [{"message": {"id": message_id}}]} for message_id in deleted],
+            "historyId": str(self.history_id),
+        }
+
+    def users(self):
+        request = lambda method_id, call: lambda userId="me", **kwargs: FakeRequest(
+            self, method_id, lambda: call(**kwargs)
+        )
+        return _Resource(
+            getProfile=request("gmail.users.getProfile", lambda: {"historyId": str(self.history_id)}),
+            messages=lambda: _Resource(
+                list=request("gmail.users.messages.list", self._list),
+                get=request("gmail.users.messages.get", self._get),
+                send=request("gmail.users.messages.send", self._send),
+                delete=request("gmail.users.messages.delete", lambda id, **kwargs: self._delete(id)),
+                batchModify=request("gmail.users.messages.batchModify", self._batch_modify),
+                batchDelete=request("gmail.users.messages.batchDelete", self._batch_delete),
+            ),
+            history=lambda: _Resource(list=request("gmail.users.history.list", self._history)),
+            labels=lambda: _Resource(list=request("gmail.users.labels.list", self._labels)),
+        )
+
+
+class FakeCalendarService(FakeBackend):
+    def __init__(self, events=(), latency=0.0):
+        super().__init__(latency)
+        self.events_by_id = {}
+        self.ids = itertools.count(1)
+        for event in events:
+            self._insert(body=event)
+
+    @classmethod
+    def with_schedule(cls, days, per_day=4, latency=0.0):
+        start = datetime.datetime.utcnow().replace(hour=9, minute=0, second=0, microsecond=0)
+        events = []
+        for day in range(days):
+            for slot in range(per_day):
+                begin = start + datetime.timedelta(days=day, hours=2 * slot)
+                events.append({
+                    "summary": f"Meeting {day}-{slot}",
+                    "description": "Weekly sync " * 20,
+                    "start": {"dateTime": begin.isoformat() + "Z", "timeZone": "UTC"},
+                    "end": {"dateTime": (begin + datetime.timedelta(hours=1)).isoformat() + "Z", "timeZone": "UTC"},
+                    "attendees": [{"email": f"person{slot}@example.com", "responseStatus": "accepted"}],
+                })
+        return cls(events, latency=latency)
+
+    def _event(self, eventId, **kwargs):
+        if eventId not in self.events_by_id:
+            raise _http_error(404, "Not Found")
+        return self.events_by_id[eventId]
+
+    def _insert(self, body, **kwargs):
+        event_id = f"e{next(self.ids)}"
+        self.events_by_id[event_id] = {
+            "kind": "calendar#event", "id": event_id, "status": "confirmed", "etag": f'"{event_id}"',
+            "htmlLink": f"https://calendar.example.com/{event_id}", **body,
+        }
+        return self.events_by_id[event_id]
+
+    def _list(self, timeMin=None, maxResults=250, pageToken=None, **kwargs):
+        events = sorted(
+            (event for event in self.events_by_id.values()
+             if not timeMin or event["end"].get("dateTime", "") >= timeMin),
+            key=lambda event: event["start"].get("dateTime", ""),
+        )
+        start = int(pageToken or 0)
+        response = {"kind": "calendar#events", "items": events[start:start + maxResults]}
+        if start + maxResults < len(events):
+            response["nextPageToken"] = str(start + maxResults)
+        return response
+
+    def _update(self, eventId, body, **kwargs):
+        self._event(eventId)
+        self.events_by_id[eventId] = {**body, "id": eventId}
+        return self.events_by_id[eventId]
+
+    def _patch(self, eventId, body, **kwargs):
+        self._event(eventId).update(body)
+        return self.events_by_id[eventId]
+
+    def _delete(self, eventId, **kwargs):
+        self._event(eventId)
+        del self.events_by_id[eventId]
+        return ""
+
+    def _freebusy(self, body, **kwargs):
+        busy = [
+            {"start": event["start"]["dateTime"], "end": event["end"]["dateTime"]}
+            for event in self._list(timeMin=body["timeMin"], maxResults=10000)["items"]
+            if event["start"].get("dateTime", "") < body["timeMax"]
+        ]
+        return {"calendars": {item["id"]: {"busy": busy} for item in body.get("items", [])}}
+
+    def events(self):
+        request = lambda method_id, call: lambda calendarId="primary", **kwargs: FakeRequest(
+            self, method_id, lambda: call(**kwargs)
+        )
+        return _Resource(
+            list=request("calendar.events.list", self._list),
+            get=request("calendar.events.get", self._event),
+            insert=request("calendar.events.insert", self._insert),
+            update=request("calendar.events.update", self._update),
+            patch=request("calendar.events.patch", self._patch),
+            delete=request("calendar.events.delete", self._delete),
+        )
+
+    def freebusy(self):
+        return _Resource(query=lambda **kwargs: FakeRequest(self, "calendar.freebusy.query",
+                                                            lambda: self._freebusy(**kwargs)))
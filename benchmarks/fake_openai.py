@@ -0,0 +1,105 @@
+"""A scripted stand-in for the OpenAI client used by main.run_full_turn.
+
+Each call to chat.completions.create pops the next step of the script. A step is either
+{"content": "..."} or {"tool_calls": [(name, arguments_dict), ...]}, or a callable taking the
+request messages and returning one of those. Responses are real openai ChatCompletion (or
+ChatCompletionChunk when stream=True) objects, so the agent loop runs unmodified.
+"""
+from context_budget import estimate_tokens
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+import itertools
+import json
+import threading
+import time
+
+
+def _message_text(message):
+    if hasattr(message, "model_dump_json"):
+        return message.model_dump_json(exclude_none=True)
+    return json.dumps(message, default=str)
+
+
+class FakeChatCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model, messages, tools=None, stream=False, stream_options=None, **kwargs):
+        return self.owner.complete(model, messages, tools, stream, (stream_options or {}).get("include_usage"))
+
+
+class FakeOpenAI:
+    def __init__(self, script, latency=0.0, first_token_latency=None, chunk_size=8):
+        self.script = list(script)
+        self.latency = latency
+        self.first_token_latency = latency / 4 if first_token_latency is None else first_token_latency
+        self.chunk_size = chunk_size
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = FakeChatCompletions(self)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.calls = []  # per call: prompt tokens, tools offered, tool calls returned
+
+    def complete(self, model, messages, tools, stream, include_usage=False):
+        with self.lock:
+            if not self.script:
+                raise RuntimeError("FakeOpenAI script exhausted")
+            step = self.script.pop(0)
+        if callable(step):
+            step = step(messages)
+
+        prompt_tokens = sum(estimate_tokens(_message_text(message)) for message in messages)
+        prompt_tokens += estimate_tokens(json.dumps(tools)) if tools else 0
+        content = step.get("content")
+        tool_calls = [
+            {"id": f"call_{next(self.ids)}", "type": "function",
+             "function": {"name": name, "arguments": json.dumps(arguments)}}
+            for name, arguments in step.get("tool_calls", [])
+        ]
+        completion_tokens = estimate_tokens(content or "") + sum(
+            estimate_tokens(call["function"]["arguments"]) for call in tool_calls
+        )
+        with self.lock:
+            self.calls.append({"prompt_tokens": prompt_tokens, "tools": len(tools or []),
+                               "tool_calls": len(tool_calls)})
+
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        if stream:
+            return self._stream(model, content, tool_calls, usage if include_usage else None)
+
+        time.sleep(self.latency)
+        return ChatCompletion.model_validate({
+            "id": f"chatcmpl-{next(self.ids)}", "object": "chat.completion", "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0, "finish_reason": "tool_calls" if tool_calls else "stop",
+                "message": {"role": "assistant", "content": content, "tool_calls": tool_calls or None},
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, model, content, tool_calls, usage=None):
+        deltas = []
+        if content:
+            deltas += [{"content": content[i:i + self.chunk_size]} for i in range(0, len(content), self.chunk_size)]
+        for index, call in enumerate(tool_calls):
+            arguments = call["function"]["arguments"]
+            deltas.append({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                           "function": {"name": call["function"]["name"], "arguments": ""}}]})
+            deltas += [{"tool_calls": [{"index": index, "function": {"arguments": arguments[i:i + self.chunk_size]}}]}
+                       for i in range(0, len(arguments), self.chunk_size)]
+
+        time.sleep(self.first_token_latency)
+        per_chunk = (self.latency - self.first_token_latency) / max(len(deltas), 1)
+        chunk_id = f"chatcmpl-{next(self.ids)}"
+        for delta in deltas:
+            yield ChatCompletionChunk.model_validate({
+                "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            })
+            time.sleep(per_chunk)
+        if usage is not None:  # like the API with stream_options={"include_usage": True}
+            yield ChatCompletionChunk.model_validate({
+                "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [], "usage": usage,
+            })
@@ -0,0 +1,152 @@
+"""Offline benchmarks for the agent loop, run from the repo root:
+
+    python -m benchmarks.run_benchmarks [--scenario NAME] [--model-latency 0.4] [--google-latency 0.05]
+
+Scenarios drive main.run_full_turn with FakeOpenAI and the in-memory Google fakes, configured the
+way main() configures a session, and report per turn: wall time, model calls, tool-call fan-out,
+prompt tokens sent, Google round trips and peak Python allocations (measured in a second run under
+tracemalloc so it does not skew the timings).
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")  # main builds a client at import time
+
+import main  # noqa: E402
+from actions import GmailActions  # noqa: E402
+from benchmarks.fake_google import FakeCalendarService, FakeGmailService  # noqa: E402
+from benchmarks.fake_openai import FakeOpenAI  # noqa: E402
+from context_budget import ContextWindow, estimate_tokens  # noqa: E402
+from message_store import MessageStore  # noqa: E402
+from tool_results import ToolResultStore  # noqa: E402
+
+
+def list_500_direct(options):
+    """GmailActions.list_messages(500) without the model, the Gmail fetch path alone."""
+    gmail = FakeGmailService.with_inbox(500, latency=options.google_latency)
+    actions = GmailActions(gmail)
+    return [("list_messages(500)", lambda: actions.list_messages(max_results=500), None, [gmail])]
+
+
+def list_500_agent(options):
+    """One user turn: triage -> Gmail agent -> list 500 emails -> answer."""
+    gmail = FakeGmailService.with_inbox(500, latency=options.google_latency)
+    calendar = FakeCalendarService.with_schedule(days=7, latency=options.google_latency)
+    main.attach_tools(gmail, calendar, store=MessageStore(":memory:"))
+    fake = FakeOpenAI([
+        {"tool_calls": [("transfer_to_gmail_agent", {})]},
+        {"tool_calls": [("list_messages", {"max_results": 500})]},
+        {"content": "You have 500 emails, 72 of them are invoices."},
+    ], latency=options.model_latency)
+    return [("list 500 emails", "Summarize my last 500 emails", fake, [gmail, calendar])]
+
+
+def multi_hop(options):
+    """Two user turns: triage -> Gmail (search, open) then triage -> Calendar (list, create)."""
+    gmail = FakeGmailService.with_inbox(200, latency=options.google_latency)
+    calendar = FakeCalendarService.with_schedule(days=14, latency=options.google_latency)
+    main.attach_tools(gmail, calendar, store=MessageStore(":memory:"))
+    first_id = max(gmail.messages)
+    fake = FakeOpenAI([
+        {"tool_calls": [("transfer_to_gmail_agent", {})]},
+        {"tool_calls": [("list_messages", {"max_results": 20, "query": "Invoice"})]},
+        {"tool_calls": [("get_message", {"message_id": first_id})]},
+        {"content": "The latest invoice is from sender0@example.com."},
+        {"tool_calls": [("transfer_to_calendar_agent", {})]},
+        {"tool_calls": [("list_events", {"max_results": 50})]},
+        {"tool_calls": [("create_event", {"summary": "Pay invoice", "start_time": "2030-01-02T10:00:00",
+                                          "end_time": "2030-01-02T10:30:00"})]},
+        {"content": "Added 'Pay invoice' to your calendar."},
+    ], latency=options.model_latency)
+    return [
+        ("triage -> gmail", "Find my latest invoice", fake, [gmail, calendar]),
+        ("triage -> calendar", "Book time tomorrow to pay it", fake, [gmail, calendar]),
+    ]
+
+
+SCENARIOS = {"list_500_direct": list_500_direct, "list_500_agent": list_500_agent, "multi_hop": multi_hop}
+
+
+def run_scenario(build, options, trace_allocations):
+    """Run every turn of a freshly built scenario and return one result row per turn."""
+    rows = []
+    messages = []
+    context = ContextWindow(count_tokens=estimate_tokens)
+    result_store = ToolResultStore(limits={"get_message": 8000})
+    for name, turn, fake, backends in build(options):
+        google_before = sum(backend.stats["round_trips"] for backend in backends)
+        calls_before = len(fake.calls) if fake else 0
+        if trace_allocations:
+            tracemalloc.start()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if fake is None:
+                turn()
+            else:
+                messages.append({"role": "user", "content": turn})
+                response = main.run_full_turn(
+                    main.triage_agent, messages, parallel_tool_calls=True, stream=options.stream,
+                    context=context, result_store=result_store, openai_client=fake,
+                )
+                messages.extend(response.messages)
+        elapsed = time.perf_counter() - started
+        peak = None
+        if trace_allocations:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        calls = fake.calls[calls_before:] if fake else []
+        tool_turns = [call["tool_calls"] for call in calls if call["tool_calls"]]
+        rows.append({
+            "turn": name,
+            "seconds": elapsed,
+            "model_calls": len(calls),
+            "tool_calls": sum(tool_turns),
+            "max_fan_out": max(tool_turns, default=0),
+            "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+            "google_round_trips": sum(backend.stats["round_trips"] for backend in backends) - google_before,
+            "peak_kib": peak / 1024 if peak is not None else None,
+        })
+    return rows
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="scenario to run, may be repeated (default: all)")
+    parser.add_argument("--model-latency", type=float, default=0.4, help="seconds per fake completion")
+    parser.add_argument("--google-latency", type=float, default=0.05, help="seconds per fake Google round trip")
+    parser.add_argument("--no-stream", dest="stream", action="store_false", help="use non-streaming completions")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per scenario, the best is reported")
+    parser.add_argument("--output", help="also write the report to this file")
+    options = parser.parse_args(argv)
+
+    header = (f"{'scenario':<16} {'turn':<20} {'seconds':>8} {'model':>6} {'tools':>6} {'fan-out':>8} "
+              f"{'tokens':>8} {'google':>7} {'peak KiB':>9}")
+    lines = [header, "-" * len(header)]
+    for scenario in options.scenario or sorted(SCENARIOS):
+        build = SCENARIOS[scenario]
+        timings = [run_scenario(build, options, trace_allocations=False) for _ in range(options.repeat)]
+        best = min(timings, key=lambda rows: sum(row["seconds"] for row in rows))
+        allocations = run_scenario(build, options, trace_allocations=True)
+        for row, traced in zip(best, allocations):
+            lines.append(
+                f"{scenario:<16} {row['turn']:<20} {row['seconds']:>8.3f} {row['model_calls']:>6} "
+                f"{row['tool_calls']:>6} {row['max_fan_out']:>8} {row['prompt_tokens']:>8} "
+                f"{row['google_round_trips']:>7} {traced['peak_kib']:>9.0f}"
+            )
+
+    report = "\n".join(lines)
+    print(report)
+    if options.output:
+        with open(options.output, "w") as output:
+            output.write(report + "\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from openai.types.chat import ChatCompletion
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def _normalize(value):
+    """Turn pydantic messages and dicts into plain JSON values, dropping unset (None) fields."""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+class MemoryBackend:
+    """In-process LRU holding at most max_entries completions."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, expires_at):
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class DiskBackend:
+    """SQLite file holding at most max_entries completions, least recently used evicted first."""
+
+    def __init__(self, path="completion_cache.db", max_entries=10000):
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    expires_at REAL,
+                    used_at REAL
+                )"""
+            )
+
+    def get(self, key):
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT value, expires_at FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] < now:
+                self.conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                return None
+            self.conn.execute("UPDATE completions SET used_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key, value, expires_at):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time()),
+            )
+            self.conn.execute(
+                """DELETE FROM completions WHERE key NOT IN (
+                    SELECT key FROM completions ORDER BY used_at DESC LIMIT ?
+                )""",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+
+class CompletionCache:
+    """Opt-in cache of chat completions for deterministic replays (e.g. re-running a Skill on mock data).
+
+    Keys hash the model, the full message list (system instructions included) and the tool
+    schemas, so any change in prompt or tool state is a miss. Entries expire after ttl seconds
+    (None keeps them until evicted by the backend).
+    """
+
+    def __init__(self, backend=None, ttl=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, model, messages, tools=None):
+        payload = json.dumps(
+            {"model": model, "messages": _normalize(messages), "tools": _normalize(tools or [])},
+            sort_keys=True, separators=(",", ":"), default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return ChatCompletion.model_validate_json(value)
+
+    def set(self, key, response):
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        self.backend.set(key, response.model_dump_json(), expires_at)
+
+    def create(self, client, **kwargs):
+        """client.chat.completions.create(**kwargs), answered from the cache when possible."""
+        key = self.key(kwargs["model"], kwargs["messages"], kwargs.get("tools"))
+        response = self.get(key)
+        if response is None:
+            response = client.chat.completions.create(**kwargs)
+            self.set(key, response)
+        return response
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.backend),
+            }
@@ -0,0 +1,124 @@
+try:
+    import tiktoken
+except ImportError:  # fall back to a rough 4 characters per token estimate
+    tiktoken = None
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def default_token_counter(model="gpt-4o-mini"):
+    if tiktoken is None:
+        return estimate_tokens
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # tiktoken downloads encodings on first use, which fails offline
+        print(f"Falling back to estimated token counts: {e}")
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _get(message, key):
+    if isinstance(message, dict):
+        return message.get(key)
+    return getattr(message, key, None)
+
+
+class ContextWindow:
+    """Keeps the messages sent on each completion under a token budget.
+
+    The conversation is assumed to be append-only (as in main()), so compaction is tracked by index:
+    tool outputs before `elide_before` are shortened and messages before `cut` are replaced by one
+    summary note. Both only move forward, and only when the budget is exceeded, after which the
+    window is shrunk to `target` so the next compaction is several turns away. Between compactions
+    the prefix sent to the model is byte-identical, which keeps provider prompt caching effective.
+    """
+
+    def __init__(self, max_tokens=16000, target=0.6, keep_recent=8, tool_output_chars=800,
+                 count_tokens=None, summarize=None):
+        self.max_tokens = max_tokens
+        self.target_tokens = int(max_tokens * target)
+        self.keep_recent = keep_recent
+        self.tool_output_chars = tool_output_chars
+        self.count_tokens = count_tokens or default_token_counter()
+        # summarize(dropped_messages) -> str, e.g. an LLM call; without it dropped turns are just noted
+        self.summarize = summarize
+
+        self.cut = 0
+        self.elide_before = 0
+        self.summary = None
+        self._counts = {}  # (index, elided) -> tokens
+
+    def fit(self, messages):
+        """Return the compacted view of messages to send to the model."""
+        if self._total(messages) > self.max_tokens:
+            self._compact(messages)
+        return self._view(messages)
+
+    def _compact(self, messages):
+        self.elide_before = max(self.elide_before, len(messages) - self.keep_recent)
+        cut = self.cut
+        while self._total(messages, cut) > self.target_tokens:
+            next_cut = self._next_turn_start(messages, cut + 1)
+            if next_cut is None or next_cut > len(messages) - self.keep_recent:
+                break
+            cut = next_cut
+
+        if cut != self.cut:
+            dropped = messages[:cut]
+            if self.summarize is not None:
+                self.summary = self.summarize(dropped)
+            else:
+                self.summary = f"{cut} earlier messages were omitted to stay within the context budget."
+            self.cut = cut
+            self._counts = {key: value for key, value in self._counts.items() if key[0] >= cut}
+
+    def _next_turn_start(self, messages, start):
+        # cut only at user messages so no tool result is separated from the call that produced it
+        for index in range(start, len(messages)):
+            if _get(messages[index], "role") == "user":
+                return index
+        return None
+
+    def _view(self, messages):
+        view = []
+        if self.summary:
+            view.append({"role": "user", "content": f"[Conversation summary] {self.summary}"})
+        for index in range(self.cut, len(messages)):
+            view.append(self._compacted(messages[index], index < self.elide_before))
+        return view
+
+    def _compacted(self, message, elided):
+        if not elided or _get(message, "role") != "tool":
+            return message
+        content = _get(message, "content") or ""
+        if len(content) <= self.tool_output_chars:
+            return message
+        return {
+            **message,
+            "content": content[:self.tool_output_chars]
+            + f"... [truncated {len(content) - self.tool_output_chars} chars of an earlier tool result]",
+        }
+
+    def _total(self, messages, cut=None):
+        cut = self.cut if cut is None else cut
+        total = self.count_tokens(self.summary) if self.summary else 0
+        for index in range(cut, len(messages)):
+            elided = index < self.elide_before
+            key = (index, elided)
+            if key not in self._counts:
+                self._counts[key] = self._count_message(self._compacted(messages[index], elided))
+            total += self._counts[key]
+        return total
+
+    def _count_message(self, message):
+        tokens = 4  # per-message framing overhead
+        tokens += self.count_tokens(_get(message, "content") or "")
+        for tool_call in _get(message, "tool_calls") or []:
+            function = _get(tool_call, "function")
+            tokens += self.count_tokens(_get(function, "name") or "") + self.count_tokens(_get(function, "arguments") or "")
+        return tokens
@@ -0,0 +1,70 @@
+from bisect import bisect_left, bisect_right
+import datetime
+
+
+def parse_time(value):
+    """Parse an RFC 3339 / ISO 8601 time, reading naive values as UTC like the Calendar tools do."""
+    if isinstance(value, datetime.datetime):
+        parsed = value
+    else:
+        parsed = datetime.datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=datetime.timezone.utc)
+
+
+class BusyIndex:
+    """Sorted, non-overlapping busy intervals of one calendar (or the union of several).
+
+    Overlapping and touching intervals are merged on insert, so conflict checks and free-slot
+    scans are a bisect plus a walk over the intervals that actually intersect the range.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            elif start < end:
+                merged.append([start, end])
+        for start, end in merged:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    @classmethod
+    def union(cls, indexes):
+        return cls(interval for index in indexes for interval in index)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start, end):
+        if start >= end:
+            return
+        # intervals ending at or after start and beginning at or before end are absorbed
+        first = bisect_left(self.ends, start)
+        last = bisect_right(self.starts, end)
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+    def conflicts(self, start, end):
+        """Return the busy intervals overlapping [start, end)."""
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        return list(zip(self.starts[first:last], self.ends[first:last]))
+
+    def free(self, start, end, min_duration=datetime.timedelta(0)):
+        """Yield the free (start, end) gaps inside [start, end) lasting at least min_duration."""
+        cursor = start
+        for busy_start, busy_end in self.conflicts(start, end):
+            if busy_start - cursor >= min_duration and busy_start > cursor:
+                yield cursor, busy_start
+            cursor = max(cursor, busy_end)
+        if end - cursor >= min_duration and end > cursor:
+            yield cursor, end
@@ -1,15 +1,30 @@
 from setup import initialize_services
 from actions import GmailActions, CalendarActions
+from message_store import MessageStore
+from tool_schema import decode_arguments, function_to_schema
+from context_budget import ContextWindow
+from tool_results import ToolResultStore
+from completion_cache import CompletionCache, DiskBackend
+from tracing import tracer, configure as configure_tracing
+from router import Router, GMAIL_KEYWORDS, CALENDAR_KEYWORDS
+from session_store import SessionStore
+from skills import PlanExecutor, SkillStore, compile_skill
 from openai import OpenAI
-from pydantic import BaseModel
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+from pydantic import BaseModel, PrivateAttr
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import json
 import os
 from dotenv import load_dotenv
-import inspect
 
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+tool_executor = ThreadPoolExecutor(max_workers=8)
+# full payloads of compacted tool results, paged by the agents through read_tool_result
+tool_results = ToolResultStore(limits={"get_message": 8000})
 
 class Agent(BaseModel):
     name: str = "Agent"
@@ -17,108 +32,202 @@ class Agent(BaseModel):
     instructions: str = "You are a helpful Agent"
     tools: list = []
 
+    _tools_key: Optional[tuple] = PrivateAttr(default=None)
+    _tool_schemas: list = PrivateAttr(default_factory=list)
+    _tool_map: dict = PrivateAttr(default_factory=dict)
+
+    def compile_tools(self):
+        """Return (tool schemas, name -> tool map), rebuilt only when self.tools changes."""
+        key = tuple(self.tools)
+        if key != self._tools_key:
+            self._tool_schemas = [function_to_schema(tool) for tool in key]
+            self._tool_map = {tool.__name__: tool for tool in key}
+            self._tools_key = key
+        return self._tool_schemas, self._tool_map
+
 class Response(BaseModel):
     agent: Optional[Agent]
     messages: list
 
-def run_full_turn(agent, messages):
-    current_agent = agent
-    num_init_messages = len(messages)
-    messages = messages.copy()
+def run_full_turn(agent, messages, parallel_tool_calls=False, stream=False, on_delta=None, context=None,
+                  result_store=None, completion_cache=None, openai_client=None):
+    openai_client = openai_client or client
+    with tracer.span("turn", agent=agent.name, history=len(messages)):
+        current_agent = agent
+        num_init_messages = len(messages)
+        messages = messages.copy()
 
-    while True:
-        # turn python functions into tools and save a reverse map
-        tool_schemas = [function_to_schema(tool) for tool in current_agent.tools]
-        tools = {tool.__name__: tool for tool in current_agent.tools}
-
-        # === 1. get openai completion ===
-        response = client.chat.completions.create(
-            model=current_agent.model,
-            messages=[{"role": "system", "content": current_agent.instructions}]
-            + messages,
-            tools=tool_schemas or None,
-        )
-        message = response.choices[0].message
-        messages.append(message)
+        while True:
+            # turn python functions into tools and save a reverse map (cached on the agent)
+            tool_schemas, tools = current_agent.compile_tools()
+
+            # keep what is sent under the session's token budget (the full history is still returned)
+            request_messages = context.fit(messages) if context is not None else messages
+
+            # === 1. get openai completion ===
+            # a completion cache answers whole responses, so it takes precedence over streaming
+            stream = stream and completion_cache is None
+            with tracer.span("model_call", agent=current_agent.name, model=current_agent.model, stream=stream,
+                             messages=len(request_messages), tools=len(tool_schemas)) as model_span:
+                if tracer.enabled:
+                    model_span.set(request_bytes=len(json.dumps(request_messages, default=str)))
+                if stream:  # content is surfaced through on_delta and tools start while streaming
+                    message, futures, usage = stream_completion(current_agent, request_messages, tool_schemas,
+                                                                tools, on_delta, openai_client)
+                    if usage is not None:
+                        model_span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+                else:
+                    request = dict(
+                        model=current_agent.model,
+                        messages=[{"role": "system", "content": current_agent.instructions}]
+                        + request_messages,
+                        tools=tool_schemas or None,
+                    )
+                    if completion_cache is not None:
+                        response = completion_cache.create(openai_client, **request)
+                    else:
+                        response = openai_client.chat.completions.create(**request)
+                    message = response.choices[0].message
+                    if response.usage is not None:
+                        model_span.set(prompt_tokens=response.usage.prompt_tokens,
+                                       completion_tokens=response.usage.completion_tokens)
+                model_span.set(tool_calls=len(message.tool_calls or []), content_chars=len(message.content or ""))
+            messages.append(message)
+
+            if message.content and not stream:  # print agent response
+                print(f"{current_agent.name}:", message.content)
+
+            if not message.tool_calls:  # if finished handling tool calls, break
+                break
+
+            # === 2. handle tool calls ===
+            if stream:
+                results = (future.result() for future in futures)
+            elif parallel_tool_calls:
+                results = execute_tool_calls_parallel(message.tool_calls, tools, current_agent.name)
+            else:
+                results = (execute_tool_call(tool_call, tools, current_agent.name) for tool_call in message.tool_calls)
+
+            for tool_call, result in zip(message.tool_calls, results):
+                if isinstance(result, Agent):  # if agent transfer, update current agent
+                    with tracer.span("handoff", from_agent=current_agent.name, to_agent=result.name):
+                        current_agent = result
+                    result = f"Transfered to {current_agent.name}. Adopt persona immediately."
+                elif result_store is not None:  # project and cap large Google payloads
+                    result = result_store.compact(tool_call.function.name, result)
+                elif not isinstance(result, str):  # tool message content must be a string
+                    result = json.dumps(result, default=str)
+
+                result_message = {
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "content": result,
+                }
+                messages.append(result_message)
+
+        # ==== 3. return last agent used and new messages =====
+        # the agent itself, not a .dict() copy: a model instance passes validation without being rebuilt
+        return Response(agent=current_agent, messages=messages[num_init_messages:])
+
+def stream_completion(agent, messages, tool_schemas, tools, on_delta=None, openai_client=None):
+    """Stream one completion, passing content deltas to on_delta(text) as they arrive.
+
+    Without on_delta the content is printed as it streams. Tool call argument fragments are
+    assembled per index; each tool call is submitted to tool_executor as soon as it is complete
+    (the next one starts or the stream ends), so tools run while the model is still generating.
+    Returns the assembled assistant message, the tool futures in tool_call order and the token
+    usage reported in the final chunk (None if the server sent none).
+    """
+    chunks = (openai_client or client).chat.completions.create(
+        model=agent.model,
+        messages=[{"role": "system", "content": agent.instructions}] + messages,
+        tools=tool_schemas or None,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    content = []
+    pending = []  # [id, name, argument fragments] per tool call index
+    tool_calls = []
+    futures = []
+    usage = None
 
-        if message.content:  # print agent response
-            print(f"{current_agent.name}:", message.content)
+    def submit(call_id, name, arguments):
+        tool_call = ChatCompletionMessageToolCall(
+            id=call_id, type="function", function=Function(name=name, arguments="".join(arguments))
+        )
+        tool_calls.append(tool_call)
+        futures.append(submit_tool_call(tool_call, tools, agent.name))
 
-        if not message.tool_calls:  # if finished handling tool calls, break
-            break
+    for chunk in chunks:
+        if chunk.usage is not None:  # sent in a last chunk with no choices
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
 
-        # === 2. handle tool calls ===
-        for tool_call in message.tool_calls:
-            result = execute_tool_call(tool_call, tools, current_agent.name)
+        if delta.content:
+            if on_delta is not None:
+                on_delta(delta.content)
+            else:
+                if not content:
+                    print(f"{agent.name}: ", end="")
+                print(delta.content, end="", flush=True)
+            content.append(delta.content)
 
-            if isinstance(result, Agent):  # if agent transfer, update current agent
-                current_agent = result
-                result = f"Transfered to {current_agent.name}. Adopt persona immediately."
+        for fragment in delta.tool_calls or []:
+            if fragment.index == len(pending):  # a new tool call means the previous one is complete
+                if pending:
+                    submit(*pending[-1])
+                elif content and on_delta is None:
+                    print()  # end the streamed line before tool calls are logged
+                pending.append([fragment.id, "", []])
+            call = pending[fragment.index]
+            if fragment.function and fragment.function.name:
+                call[1] += fragment.function.name
+            if fragment.function and fragment.function.arguments:
+                call[2].append(fragment.function.arguments)
 
-            result_message = {
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "content": result,
-            }
-            messages.append(result_message)
+    if pending:
+        submit(*pending[-1])
+    elif content and on_delta is None:
+        print()
 
-    # ==== 3. return last agent used and new messages =====
-    return Response(agent=current_agent.dict(), messages=messages[num_init_messages:])
+    message = ChatCompletionMessage(role="assistant", content="".join(content) or None, tool_calls=tool_calls or None)
+    return message, futures, usage
 
 def execute_tool_call(tool_call, tools, agent_name):
     name = tool_call.function.name
-    args = json.loads(tool_call.function.arguments)
+    if name not in tools:
+        return f"Unknown tool {name}, available tools: {', '.join(tools)}"
+    try:  # bad arguments go straight back to the model instead of failing at the Google API
+        args = decode_arguments(tools[name], tool_call.function.arguments)
+    except ValueError as error:
+        print(f"{agent_name}:", error)
+        return str(error)
 
     print(f"{agent_name}:", f"{name}({args})")
 
-    return tools[name](**args)  # call corresponding function with provided arguments
-
-def function_to_schema(func) -> dict:
-    type_map = {
-        str: "string",
-        int: "integer",
-        float: "number",
-        bool: "boolean",
-        list: "array",
-        dict: "object",
-        type(None): "null",
-    }
-
-    try:
-        signature = inspect.signature(func)
-    except ValueError as e:
-        raise ValueError(
-            f"Failed to get signature for function {func.__name__}: {str(e)}"
-        )
+    with tracer.span("tool_call", tool=name, agent=agent_name, argument_bytes=len(tool_call.function.arguments)) as span:
+        result = tools[name](**args)  # call corresponding function with provided arguments
+        if isinstance(result, str):
+            span.set(result_chars=len(result))
+        elif isinstance(result, (list, dict)):
+            span.set(result_items=len(result))
+        return result
 
-    parameters = {}
-    for param in signature.parameters.values():
-        try:
-            param_type = type_map.get(param.annotation, "string")
-        except KeyError as e:
-            raise KeyError(
-                f"Unknown type annotation {param.annotation} for parameter {param.name}: {str(e)}"
-            )
-        parameters[param.name] = {"type": param_type}
-
-    required = [
-        param.name
-        for param in signature.parameters.values()
-        if param.default == inspect._empty
-    ]
+def submit_tool_call(tool_call, tools, agent_name):
+    """Run execute_tool_call on tool_executor, keeping the caller's trace context."""
+    return tool_executor.submit(contextvars.copy_context().run, execute_tool_call, tool_call, tools, agent_name)
 
-    return {
-        "type": "function",
-        "function": {
-            "name": func.__name__,
-            "description": (func.__doc__ or "").strip(),
-            "parameters": {
-                "type": "object",
-                "properties": parameters,
-                "required": required,
-            },
-        },
-    }
+def execute_tool_calls_parallel(tool_calls, tools, agent_name):
+    """Run one turn's tool calls concurrently and return their results in tool_call order.
+
+    Services from setup.ServiceFactory give every worker thread its own transport, so calls on the
+    same GmailActions/CalendarActions instance are safe to run side by side. Agent transfers are
+    applied by the caller in tool_call order, exactly as in sequential mode.
+    """
+    futures = [submit_tool_call(tool_call, tools, agent_name) for tool_call in tool_calls]
+    return [future.result() for future in futures]
 
 # Modify the gmail_agent function to return an Agent instance directly
 gmail_agent = Agent(
@@ -139,7 +248,8 @@ calendar_agent = Agent(
     name="Google Calendar Agent",
     instructions=(
         "You are a Calendar assistant. Help the user with calendar-related tasks "
-        "such as listing events, creating events, updating events, and deleting events."
+        "such as listing events, finding free time, creating events, updating events, and deleting events. "
+        "Use find_free_slots to schedule meetings instead of comparing listed events yourself."
     ), # Tools set later below
 )
 
@@ -166,35 +276,112 @@ triage_agent = Agent(
     ],
 )
 
-def main():
-    gmail_service, calendar_service = initialize_services()
-    gmail_actions = GmailActions(gmail_service)
-    calendar_actions = CalendarActions(calendar_service)
+# Sessions refer to agents by name, resolved here when a conversation is resumed
+agents = {agent.name: agent for agent in (triage_agent, gmail_agent, calendar_agent)}
+
+# Routes clear-cut requests straight to a specialist, unclear ones still go through triage_agent
+router = Router([(gmail_agent, GMAIL_KEYWORDS), (calendar_agent, CALENDAR_KEYWORDS)])
+
+def attach_tools(gmail_service=None, calendar_service=None, store=None, gmail_executor=None,
+                 calendar_executor=None):
+    """Give the Gmail and Calendar agents their tools, building the Google services unless given.
+
+    gmail_executor and calendar_executor are RequestExecutors that pace and retry the API calls,
+    e.g. RequestExecutor.for_gmail(burst=...) for an account with a different quota.
+    """
+    if gmail_service is None or calendar_service is None:
+        gmail_service, calendar_service = initialize_services()
+    gmail_actions = GmailActions(gmail_service, store=store if store is not None else MessageStore(),
+                                 executor=gmail_executor)
+    calendar_actions = CalendarActions(calendar_service, executor=calendar_executor)
 
     gmail_agent.tools = [
         gmail_actions.list_messages,
         gmail_actions.get_message,
+        gmail_actions.search_local,
         gmail_actions.send_message,
         gmail_actions.delete_message,
+        gmail_actions.batch_delete,
+        gmail_actions.batch_label,
+        gmail_actions.archive,
+        tool_results.read_tool_result,
     ]
     calendar_agent.tools = [
         calendar_actions.list_events,
+        calendar_actions.find_free_slots,
         calendar_actions.create_event,
         calendar_actions.update_event,
+        calendar_actions.create_events,
+        calendar_actions.update_events,
         calendar_actions.delete_event,
+        tool_results.read_tool_result,
     ]
+    return gmail_actions, calendar_actions
+
+def skill_command(line, last_turn, skill_store, plan_executor):
+    """Handle /skills, /save NAME [param=value ...] and /run NAME [param=value ...].
+
+    /save compiles the previous turn into a skill, the param values name the inputs that change
+    between runs; /run replays a saved skill with new values, going to the model only for
+    judgment steps.
+    """
+    command, *words = line.split()
+    name = words[0] if words else None
+    params = dict(word.split("=", 1) for word in words[1:] if "=" in word)
+    if command == "/skills":
+        return ", ".join(skill_store.names()) or "No saved skills."
+    if command == "/save" and name:
+        if not last_turn:
+            return "Nothing to save yet, run the workflow once first."
+        try:
+            skill = compile_skill(name, last_turn, params, result_store=tool_results)
+        except ValueError as error:
+            return f"Could not save {name}: {error}"
+        skill_store.save(skill)
+        return f"Saved skill {name} with {len(skill['steps'])} steps."
+    if command == "/run" and name:
+        skill = skill_store.load(name)
+        if skill is None:
+            return f"No skill named {name}."
+        result = plan_executor.run(skill, **params)
+        if "error" in result:
+            return f"Skill {name} failed at step {result['failed_step']}: {result['error']}"
+        return result["answer"] or json.dumps(result["outputs"][-1:], default=str)
+    return "Usage: /skills, /save NAME [param=value ...], /run NAME [param=value ...]"
+
+def main():
+    attach_tools()
 
-    agent = triage_agent  # Start with Triage agent
-    messages = []
+    # SESSION_ID resumes that conversation from sessions.db (or starts it), otherwise a new one is created
+    session = SessionStore(os.getenv("SESSION_DB", "sessions.db")).open(os.getenv("SESSION_ID"),
+                                                                       triage_agent.name)
+    agent = agents.get(session.agent_name, triage_agent)  # Start with Triage agent
+    messages = session.messages
+    print(f"Session {session.id} ({len(messages)} messages)")
+    context = ContextWindow()
+    # opt-in replay cache, e.g. COMPLETION_CACHE=completion_cache.db while testing a Skill on mock data
+    cache_path = os.getenv("COMPLETION_CACHE")
+    completion_cache = CompletionCache(DiskBackend(cache_path)) if cache_path else None
+    # TRACE_FILE=trace.jsonl writes spans as JSON lines, TRACE_OTEL=1 mirrors them to OpenTelemetry
+    configure_tracing(jsonl_path=os.getenv("TRACE_FILE"), opentelemetry=bool(os.getenv("TRACE_OTEL")))
+    # saved Skills replay straight against the tools, see skill_command
+    skill_store = SkillStore()
+    plan_executor = PlanExecutor({**gmail_agent.compile_tools()[1], **calendar_agent.compile_tools()[1]}, client)
+    last_turn = []
 
     while True:
-        print("messages: ", messages)
         user = input("User: ")
-        messages.append({"role": "user", "content": user})
+        if user.startswith("/"):
+            print(skill_command(user, last_turn, skill_store, plan_executor))
+            continue
+        agent = router.route(user, agent) or triage_agent
+        session.append([{"role": "user", "content": user}], agent.name)
 
-        response = run_full_turn(agent, messages)
+        response = run_full_turn(agent, messages, parallel_tool_calls=True, stream=True, context=context,
+                                 result_store=tool_results, completion_cache=completion_cache)
         agent = response.agent
-        messages.extend(response.messages)
+        session.append(response.messages, agent.name)
+        last_turn = [{"role": "user", "content": user}] + response.messages
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,199 @@
+from googleapiclient.errors import HttpError
+import sqlite3
+import threading
+import time
+
+
+class MessageStore:
+    """SQLite cache of parsed Gmail messages, kept in sync through users().history().list.
+
+    Message content never changes in Gmail, so the only history events that can invalidate a
+    cached row are deletions. Listings (which depend on labels and queries) still go to the API.
+    Subject, sender and body are indexed with FTS5 for offline search; triggers keep the index in
+    step with every insert, update and delete on the messages table.
+    """
+
+    def __init__(self, path="mail_cache.db"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS messages (
+                    id TEXT PRIMARY KEY,
+                    thread_id TEXT,
+                    subject TEXT,
+                    sender TEXT,
+                    body TEXT,
+                    fetched_at REAL,
+                    date TEXT,
+                    has_body INTEGER NOT NULL DEFAULT 1
+                )"""
+            )
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(messages)")}
+            if "has_body" not in columns:  # cache files created before metadata-only rows existed
+                self.conn.execute("ALTER TABLE messages ADD COLUMN date TEXT")
+                self.conn.execute("ALTER TABLE messages ADD COLUMN has_body INTEGER NOT NULL DEFAULT 1")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+            has_index = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+            ).fetchone()
+            self.conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    subject, sender, body, content='messages', content_rowid='rowid'
+                );
+                CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+                    INSERT INTO messages_fts (rowid, subject, sender, body)
+                    VALUES (new.rowid, new.subject, new.sender, new.body);
+                END;
+                CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+                    INSERT INTO messages_fts (messages_fts, rowid, subject, sender, body)
+                    VALUES ('delete', old.rowid, old.subject, old.sender, old.body);
+                END;
+                CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+                    INSERT INTO messages_fts (messages_fts, rowid, subject, sender, body)
+                    VALUES ('delete', old.rowid, old.subject, old.sender, old.body);
+                    INSERT INTO messages_fts (rowid, subject, sender, body)
+                    VALUES (new.rowid, new.subject, new.sender, new.body);
+                END;
+                """
+            )
+            if not has_index:  # cache files created before the index existed
+                self.conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
+    def get(self, message_id):
+        return self.get_many([message_id]).get(message_id)
+
+    def get_many(self, message_ids, full=False):
+        """Return {id: message} for the ids that are cached.
+
+        Rows listed with format='metadata' only hold the Gmail snippet and come back with a
+        'snippet' instead of a 'body'; with full=True they are left out so the caller fetches them.
+        """
+        if not message_ids:
+            return {}
+        placeholders = ",".join("?" * len(message_ids))
+        sql = f"SELECT id, thread_id, subject, sender, date, body, has_body FROM messages WHERE id IN ({placeholders})"
+        if full:
+            sql += " AND has_body = 1"
+        with self.lock:
+            rows = self.conn.execute(sql, list(message_ids)).fetchall()
+        return {
+            row[0]: {'id': row[0], 'threadId': row[1], 'subject': row[2], 'sender': row[3], 'date': row[4],
+                     'body' if row[6] else 'snippet': row[5]}
+            for row in rows
+        }
+
+    def put_many(self, messages):
+        """Cache parsed messages, full ones (with a 'body') or metadata-only ones (with a 'snippet').
+
+        The snippet of a metadata-only row is kept in the body column so it is still searchable, and
+        it never replaces a body that was already fetched.
+        """
+        now = time.time()
+        # an upsert rather than INSERT OR REPLACE, since REPLACE deletes do not fire the index triggers
+        with self.lock, self.conn:
+            self.conn.executemany(
+                """INSERT INTO messages (id, thread_id, subject, sender, body, fetched_at, date, has_body)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET thread_id = excluded.thread_id, subject = excluded.subject,
+                    sender = excluded.sender, date = excluded.date, fetched_at = excluded.fetched_at,
+                    body = CASE WHEN excluded.has_body >= messages.has_body THEN excluded.body ELSE messages.body END,
+                    has_body = max(messages.has_body, excluded.has_body)""",
+                [
+                    (m['id'], m['threadId'], m['subject'], m['sender'], m['body'] if 'body' in m else m.get('snippet'),
+                     now, m.get('date'), int('body' in m))
+                    for m in messages
+                ],
+            )
+
+    def search(self, query, limit=10):
+        """Rank cached messages against an FTS5 query, best match first.
+
+        Queries that are not valid FTS5 syntax are retried as a plain AND of quoted terms.
+        """
+        sql = """SELECT m.id, m.thread_id, m.subject, m.sender,
+                    snippet(messages_fts, 2, '[', ']', '...', 16),
+                    bm25(messages_fts, 5.0, 3.0, 1.0) AS rank
+                FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid
+                WHERE messages_fts MATCH ? ORDER BY rank LIMIT ?"""
+        with self.lock:
+            try:
+                rows = self.conn.execute(sql, (query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                terms = " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+                rows = self.conn.execute(sql, (terms, limit)).fetchall() if terms else []
+        return [
+            {'id': row[0], 'threadId': row[1], 'subject': row[2], 'sender': row[3], 'snippet': row[4]}
+            for row in rows
+        ]
+
+    def delete_many(self, message_ids):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM messages WHERE id = ?", [(message_id,) for message_id in message_ids])
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM messages")
+            self.conn.execute("DELETE FROM sync_state")
+
+    def _get_state(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def history_id(self):
+        return self._get_state("history_id")
+
+    @property
+    def last_synced_at(self):
+        value = self._get_state("last_synced_at")
+        return float(value) if value else 0.0
+
+    def is_fresh(self, max_age):
+        return time.time() - self.last_synced_at < max_age
+
+    def sync(self, gmail_service, executor=None):
+        """Apply mailbox changes since the last seen historyId.
+
+        The first sync only records the current historyId. If Gmail no longer has history that far
+        back (404), the cache is dropped and rebuilt from scratch on subsequent reads.
+        """
+        execute = executor.execute if executor is not None else lambda request: request.execute()
+        history_id = self.history_id
+        try:
+            if history_id is None:
+                profile = execute(gmail_service.users().getProfile(userId='me'))
+                self._set_state("history_id", profile['historyId'])
+                self._set_state("last_synced_at", time.time())
+                return
+
+            page_token = None
+            while True:
+                response = execute(gmail_service.users().history().list(
+                    userId='me', startHistoryId=history_id, historyTypes=['messageDeleted'], pageToken=page_token
+                ))
+                deleted = [
+                    item['message']['id']
+                    for record in response.get('history', [])
+                    for item in record.get('messagesDeleted', [])
+                ]
+                if deleted:
+                    self.delete_many(deleted)
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+
+            self._set_state("history_id", response['historyId'])
+            self._set_state("last_synced_at", time.time())
+        except HttpError as error:
+            if error.resp.status == 404:
+                print("Gmail history expired, clearing local message cache")
+                self.clear()
+            else:
+                print(f'An error occurred: {error}')
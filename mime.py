@@ -0,0 +1,146 @@
+from html.parser import HTMLParser
+import base64
+import codecs
+
+# markup usually outweighs the text it carries, so HTML parts may decode this many times the budget
+HTML_BUDGET_RATIO = 4
+TRUNCATED = "\n[... truncated]"
+
+_SKIP_TAGS = {"script", "style", "head", "title"}
+_BLOCK_TAGS = {"p", "div", "br", "tr", "li", "h1", "h2", "h3", "h4", "h5", "h6", "table", "blockquote", "hr"}
+
+
+def _header(part, name):
+    name = name.lower()
+    return next((header["value"] for header in part.get("headers", []) if header["name"].lower() == name), "")
+
+
+def _charset(part):
+    for param in _header(part, "Content-Type").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset":
+            return value.strip('"') or "utf-8"
+    return "utf-8"
+
+
+def is_attachment(part):
+    """Attachments are recognised from the part metadata alone, their data is never decoded."""
+    return bool(
+        part.get("filename")
+        or part.get("body", {}).get("attachmentId")
+        or _header(part, "Content-Disposition").lower().startswith("attachment")
+    )
+
+
+def iter_parts(payload):
+    """Yield the leaf parts of a Gmail message payload in document order, skipping attachments."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        if part.get("parts"):
+            stack.extend(reversed(part["parts"]))
+        elif not is_attachment(part):
+            yield part
+
+
+def decode_part(part, max_bytes):
+    """Decode at most max_bytes of a part's base64url data, returning (text, truncated).
+
+    Only the needed prefix of the encoded data is decoded, and a multi-byte character cut by the
+    budget is dropped rather than replaced.
+    """
+    data = part.get("body", {}).get("data")
+    if not data:
+        return "", False
+    encoded_budget = -(-max_bytes // 3) * 4  # 4 base64 characters carry 3 bytes
+    truncated = len(data) > encoded_budget
+    raw = base64.urlsafe_b64decode(data[:encoded_budget] + "=" * (-min(len(data), encoded_budget) % 4))
+    truncated = truncated or len(raw) > max_bytes
+    try:
+        decoder = codecs.getincrementaldecoder(_charset(part))(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    return decoder.decode(raw[:max_bytes], final=not truncated), truncated
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self, max_chars):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.chunks = []
+        self.size = 0
+        self.skipping = 0
+
+    @property
+    def full(self):
+        return self.size >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self.skipping += 1
+        elif tag in _BLOCK_TAGS:
+            self._write("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in _BLOCK_TAGS:
+            self._write("\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self._write(" ".join(data.split()) + (" " if data[-1:].isspace() else ""))
+
+    def _write(self, text):
+        if text and not self.full:
+            self.chunks.append(text)
+            self.size += len(text)
+
+
+def html_to_text(html, max_chars, chunk_size=8192):
+    """Convert HTML to plain text, feeding the parser in chunks and stopping once max_chars is reached."""
+    parser = _TextExtractor(max_chars)
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+        if parser.full:
+            break
+    else:
+        parser.close()
+    lines = (line.strip() for line in "".join(parser.chunks).splitlines())
+    text = "\n".join(line for line in lines if line)
+    return text[:max_chars], parser.full
+
+
+def extract_body(payload, max_bytes=32000):
+    """Return the readable body of a Gmail message payload, at most about max_bytes long.
+
+    All inline text/plain parts are used when there are any, otherwise the text/html parts are
+    converted to text. Attachments are skipped and every part is decoded within what is left of
+    the budget, so a huge newsletter costs no more than a short note.
+    """
+    parts = list(iter_parts(payload))
+    plain = [part for part in parts if part.get("mimeType", "").lower() == "text/plain"]
+    html = [part for part in parts if part.get("mimeType", "").lower() == "text/html"]
+
+    texts = []
+    remaining = max_bytes
+    truncated = False
+    for part in plain or html:
+        if remaining <= 0:
+            truncated = True
+            break
+        if plain:
+            text, truncated = decode_part(part, remaining)
+        else:
+            markup, cut = decode_part(part, remaining * HTML_BUDGET_RATIO)
+            text, full = html_to_text(markup, remaining)
+            truncated = cut or full
+        text = text.strip()
+        if text:
+            texts.append(text)
+            remaining -= len(text.encode("utf-8"))
+        if truncated:
+            break
+
+    body = "\n\n".join(texts)
+    return body + TRUNCATED if truncated else body
@@ -1,5 +1,6 @@
+from tool_schema import function_to_schema
 from openai import OpenAI
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from typing import Optional
 import json
 import os
@@ -9,65 +10,28 @@ load_dotenv()
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-import inspect
-
-def function_to_schema(func) -> dict:
-    type_map = {
-        str: "string",
-        int: "integer",
-        float: "number",
-        bool: "boolean",
-        list: "array",
-        dict: "object",
-        type(None): "null",
-    }
-
-    try:
-        signature = inspect.signature(func)
-    except ValueError as e:
-        raise ValueError(
-            f"Failed to get signature for function {func.__name__}: {str(e)}"
-        )
-
-    parameters = {}
-    for param in signature.parameters.values():
-        try:
-            param_type = type_map.get(param.annotation, "string")
-        except KeyError as e:
-            raise KeyError(
-                f"Unknown type annotation {param.annotation} for parameter {param.name}: {str(e)}"
-            )
-        parameters[param.name] = {"type": param_type}
-
-    required = [
-        param.name
-        for param in signature.parameters.values()
-        if param.default == inspect._empty
-    ]
-
-    return {
-        "type": "function",
-        "function": {
-            "name": func.__name__,
-            "description": (func.__doc__ or "").strip(),
-            "parameters": {
-                "type": "object",
-                "properties": parameters,
-                "required": required,
-            },
-        },
-    }
-
-
 class Agent(BaseModel):
     name: str = "Agent"
     model: str = "gpt-4o-mini"
     instructions: str = "You are a helpful Agent"
     tools: list = []
 
+    _tools_key: Optional[tuple] = PrivateAttr(default=None)
+    _tool_schemas: list = PrivateAttr(default_factory=list)
+    _tool_map: dict = PrivateAttr(default_factory=dict)
+
     class Config:
         arbitrary_types_allowed = True
 
+    def compile_tools(self):
+        """Return (tool schemas, name -> tool map), rebuilt only when self.tools changes."""
+        key = tuple(self.tools)
+        if key != self._tools_key:
+            self._tool_schemas = [function_to_schema(tool) for tool in key]
+            self._tool_map = {tool.__name__: tool for tool in key}
+            self._tools_key = key
+        return self._tool_schemas, self._tool_map
+
 # def run_full_turn(agent, messages):
 
 #     num_init_messages = len(messages)
@@ -182,9 +146,8 @@ def run_full_turn(agent, messages):
     messages = messages.copy()
 
     while True:
-        # turn python functions into tools and save a reverse map
-        tool_schemas = [function_to_schema(tool) for tool in current_agent.tools]
-        tools = {tool.__name__: tool for tool in current_agent.tools}
+        # turn python functions into tools and save a reverse map (cached on the agent)
+        tool_schemas, tools = current_agent.compile_tools()
 
         # === 1. get openai completion ===
         response = client.chat.completions.create(
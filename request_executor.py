@@ -0,0 +1,193 @@
+from googleapiclient.errors import HttpError
+from tracing import tracer
+import random
+import socket
+import threading
+import time
+
+# Gmail charges quota units per method (https://developers.google.com/gmail/api/reference/quota),
+# everything not listed here costs 5 units. Calendar counts every request as one query.
+GMAIL_QUOTA_UNITS = {
+    'gmail.users.getProfile': 1,
+    'gmail.users.history.list': 2,
+    'gmail.users.messages.list': 5,
+    'gmail.users.messages.get': 5,
+    'gmail.users.messages.delete': 10,
+    'gmail.users.messages.batchDelete': 50,
+    'gmail.users.messages.batchModify': 50,
+    'gmail.users.messages.modify': 5,
+    'gmail.users.messages.send': 100,
+}
+
+
+# requests that create something: a 5xx or a timeout may arrive after Google committed the write,
+# so retrying them could send the email or create the event twice
+NON_IDEMPOTENT_METHODS = {
+    'gmail.users.messages.send',
+    'gmail.users.messages.insert',
+    'gmail.users.messages.import',
+    'gmail.users.drafts.send',
+    'calendar.events.insert',
+    'calendar.events.import',
+    'calendar.events.quickAdd',
+}
+
+
+def is_idempotent(request):
+    return getattr(request, 'methodId', None) not in NON_IDEMPOTENT_METHODS
+
+
+def is_retryable(error, idempotent=True):
+    """Whether a failed request is worth retrying: 429, 5xx and 403 rate limit responses.
+
+    Requests that are not idempotent are only retried on 429 and 403 rate limits, which mean the
+    request was not processed.
+    """
+    if isinstance(error, (socket.timeout, ConnectionError)):
+        return idempotent
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    if status == 429:
+        return True
+    if status >= 500:
+        return idempotent
+    return status == 403 and any(reason in error.content for reason in (b'rateLimitExceeded', b'userRateLimitExceeded'))
+
+
+def is_throttle(error):
+    return isinstance(error, HttpError) and (error.resp.status == 429 or error.resp.status == 403)
+
+
+class TokenBucket:
+    """Allows `rate` units per second on average with bursts of up to `capacity` units."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, units=1):
+        """Block until `units` are available and return how long we waited."""
+        units = min(units, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= units:
+                    self.tokens -= units
+                    return waited
+                delay = (units - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RequestExecutor:
+    """Executes googleapiclient requests under a per-API quota with retries.
+
+    Each request first takes its quota cost from a token bucket, so concurrent callers slow down
+    instead of tripping the per-user limit. Retryable failures (429, 5xx, 403 rate limits and
+    transport errors) are retried up to num_retries times with exponential backoff and full jitter;
+    anything else, or the last failure, is raised to the caller as before. Requests that create
+    something (NON_IDEMPOTENT_METHODS) are only retried on rate limits.
+    """
+
+    def __init__(self, rate, burst=None, quota_units=None, default_cost=1, num_retries=5,
+                 base_delay=0.5, max_delay=32.0):
+        self.bucket = TokenBucket(rate, burst or rate)
+        self.quota_units = quota_units or {}
+        self.default_cost = default_cost
+        self.num_retries = num_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'retries': 0, 'throttles': 0, 'failures': 0, 'wait_seconds': 0.0}
+
+    @classmethod
+    def for_gmail(cls, **kwargs):
+        # 250 quota units per user per second on average; Gmail measures that as a moving average, so
+        # a minute's worth may be spent at once (a 500 message listing) before requests are paced
+        kwargs.setdefault('burst', 250 * 60)
+        return cls(rate=250, quota_units=GMAIL_QUOTA_UNITS, default_cost=5, **kwargs)
+
+    @classmethod
+    def for_calendar(cls, **kwargs):
+        # 600 queries per user per minute
+        return cls(rate=10, burst=20, **kwargs)
+
+    def metrics(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def _record(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def cost(self, request):
+        return self.quota_units.get(getattr(request, 'methodId', None), self.default_cost)
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def execute(self, request):
+        with tracer.span("google_request", method=getattr(request, 'methodId', None)) as span:
+            return self._run(request.execute, self.cost(request), span, is_idempotent(request), num_retries=0)
+
+    def execute_batch(self, service, requests, callback):
+        """Send {request_id: request} as one batch, re-batching items that fail with a retryable error.
+
+        callback(request_id, response, exception) is called once per item with its final outcome.
+        """
+        pending = dict(requests)
+        for attempt in range(self.num_retries + 1):
+            failed = {}
+
+            def collect(request_id, response, exception):
+                idempotent = is_idempotent(pending[request_id])
+                if exception is not None and is_retryable(exception, idempotent) and attempt < self.num_retries:
+                    if is_throttle(exception):
+                        self._record('throttles')
+                    failed[request_id] = pending[request_id]
+                else:
+                    if exception is not None:
+                        self._record('failures')
+                    callback(request_id, response, exception)
+
+            batch = service.new_batch_http_request(callback=collect)
+            for request_id, request in pending.items():
+                batch.add(request, request_id=request_id)
+            with tracer.span("google_request", method="batch", items=len(pending), attempt=attempt) as span:
+                # a failed batch is only resent whole when none of its items could be applied twice
+                self._run(batch.execute, sum(self.cost(request) for request in pending.values()), span,
+                          all(is_idempotent(request) for request in pending.values()))
+                span.set(retryable_failures=len(failed))
+            self._record('requests', len(pending) - 1)
+
+            if not failed:
+                return
+            self._record('retries', len(failed))
+            time.sleep(self.backoff(attempt))
+            pending = failed
+
+    def _run(self, call, cost, span, idempotent=True, **kwargs):
+        waited = 0.0
+        for attempt in range(self.num_retries + 1):
+            wait = self.bucket.acquire(cost)
+            waited += wait
+            self._record('wait_seconds', wait)
+            self._record('requests')
+            span.set(cost=cost, attempts=attempt + 1, quota_wait_ms=round(waited * 1000, 3))
+            try:
+                return call(**kwargs)
+            except (HttpError, socket.timeout, ConnectionError) as error:
+                if is_throttle(error) and is_retryable(error):
+                    self._record('throttles')
+                if not is_retryable(error, idempotent) or attempt == self.num_retries:
+                    self._record('failures')
+                    raise
+                self._record('retries')
+                time.sleep(self.backoff(attempt))
@@ -0,0 +1,54 @@
+import re
+
+# keyword -> weight; time words are weak signals since both inboxes and calendars have dates
+GMAIL_KEYWORDS = {
+    "email": 2, "emails": 2, "mail": 2, "gmail": 3, "inbox": 3, "message": 1, "messages": 1,
+    "send": 1, "sent": 1, "reply": 2, "forward": 2, "unread": 3, "sender": 2, "subject": 2,
+    "attachment": 2, "attachments": 2, "newsletter": 2, "newsletters": 2, "draft": 2, "spam": 3,
+    "invoice": 1, "invoices": 1, "archive": 2, "label": 2, "labels": 2,
+}
+CALENDAR_KEYWORDS = {
+    "calendar": 3, "gcal": 3, "meeting": 2, "meetings": 2, "event": 2, "events": 2, "schedule": 2,
+    "reschedule": 3, "appointment": 2, "appointments": 2, "invite": 1, "book": 1, "free": 1,
+    "busy": 1, "availability": 2, "available": 1, "slot": 2, "slots": 2, "call": 1,
+    "today": 0.5, "tomorrow": 0.5, "week": 0.5, "monday": 0.5, "tuesday": 0.5, "wednesday": 0.5,
+    "thursday": 0.5, "friday": 0.5,
+}
+
+_WORD = re.compile(r"[a-z]+")
+
+
+class Router:
+    """Picks the specialist agent for a user message locally, skipping the triage model call.
+
+    routes is a list of (agent, {keyword: weight}). A route wins when its score reaches min_score
+    and the runner-up scores at most `margin` times as much. Otherwise, a message that does not
+    point at any other route ("which of those mention invoices?") stays with the conversation's
+    current specialist, i.e. the last routing decision is reused. Everything else returns None so
+    the caller falls back to the triage agent.
+    """
+
+    def __init__(self, routes, min_score=2, margin=0.5):
+        self.routes = routes
+        self.min_score = min_score
+        self.margin = margin
+
+    def scores(self, text):
+        words = _WORD.findall(text.lower())
+        return [sum(keywords.get(word, 0) for word in words) for _, keywords in self.routes]
+
+    def route(self, text, current_agent=None):
+        scores = self.scores(text)
+        ranked = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+        best = ranked[0]
+        runner_up = scores[ranked[1]] if len(ranked) > 1 else 0
+
+        if scores[best] >= self.min_score and runner_up <= scores[best] * self.margin:
+            return self.routes[best][0]
+        if current_agent is not None:
+            for index, (agent, _) in enumerate(self.routes):
+                # turns hand back the Agent instances themselves and sessions resolve them through
+                # main.agents, so the current agent is one of the routes
+                if agent is current_agent and not any(scores[:index] + scores[index + 1:]):
+                    return agent
+        return None
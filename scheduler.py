@@ -0,0 +1,334 @@
+"""Background scheduler for recurring workflows, run as its own process:
+
+    python scheduler.py add "0 9 * * 1-5" skill daily_status query=is:unread
+    python scheduler.py add "@hourly" turn "Any new invoices?" --session ops
+    python scheduler.py list | remove JOB_ID | run
+
+Jobs live in a SQLite job store, so one scheduler process serves every user's jobs and picks them
+up again after a restart. Due jobs run on a worker pool with a per-job timeout; runs missed while
+the scheduler was down are caught up once (within catch_up seconds) instead of replayed one by
+one, and each next run is pushed back by a random jitter so jobs sharing a schedule do not hit
+the Google and OpenAI quotas at the same instant.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import datetime
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+# (low, high) of minute, hour, day of month, month, day of week (0 and 7 are Sunday)
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def _parse_field(field, low, high):
+    values = set()
+    for item in field.split(","):
+        spec, _, step = item.partition("/")
+        if spec == "*":
+            start, end = low, high
+        elif "-" in spec:
+            start, end = (int(part) for part in spec.split("-", 1))
+        else:
+            start = end = int(spec)
+            if step:  # "5/15" means from 5 to the end in steps of 15
+                end = high
+        if not low <= start <= end <= high:
+            raise ValueError(f"{item!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronSchedule:
+    """A standard five-field cron expression (minute hour day-of-month month day-of-week).
+
+    Fields take *, numbers, ranges, lists and /steps, plus the @daily style aliases. As in cron,
+    when both day fields are restricted a day matching either of them is due.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields, got {expression!r}")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment):
+        weekday = (moment.weekday() + 1) % 7  # cron counts from Sunday
+        if self.any_day or self.any_weekday:
+            return moment.day in self.days and weekday in self.weekdays
+        return moment.day in self.days or weekday in self.weekdays
+
+    def next_after(self, moment):
+        """Return the first due minute strictly after moment (a naive local datetime)."""
+        moment = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = moment + datetime.timedelta(days=366 * 5)
+        while moment < limit:  # skip whole months, days and hours that cannot match
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"{self.expression!r} never matches")
+
+
+def _next_run(cron, after, jitter):
+    due = CronSchedule(cron).next_after(datetime.datetime.fromtimestamp(after)).timestamp()
+    return due + random.uniform(0, jitter)
+
+
+def _last_due(job, now):
+    """The latest due time of job at or before now, starting from its stored (oldest missed) next_run.
+
+    Only slots within catch_up seconds of now can be run, so older ones are not walked through.
+    """
+    schedule = CronSchedule(job["cron"])
+    due = job["next_run"]
+    cursor = max(due, now - job["catch_up"])
+    while True:
+        following = schedule.next_after(datetime.datetime.fromtimestamp(cursor)).timestamp()
+        if following > now:
+            return due
+        due = cursor = following
+
+
+class JobStore:
+    """SQLite store of scheduled jobs and the outcome of their last run.
+
+    A job is a cron expression plus a kind and a JSON payload that the scheduler's runner for
+    that kind understands, e.g. ("skill", {"name": ..., "params": {...}}).
+    """
+
+    def __init__(self, path="jobs.db"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    cron TEXT,
+                    kind TEXT,
+                    payload TEXT,
+                    timeout REAL,
+                    jitter REAL,
+                    catch_up REAL,
+                    next_run REAL,
+                    last_run REAL,
+                    last_status TEXT,
+                    last_result TEXT
+                )"""
+            )
+
+    def add(self, cron, kind, payload, timeout=300, jitter=30, catch_up=3600, job_id=None):
+        """Schedule a job and return its id. Invalid cron expressions raise ValueError."""
+        job_id = job_id or uuid.uuid4().hex[:8]
+        next_run = _next_run(cron, time.time(), jitter)
+        with self.lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO jobs (id, cron, kind, payload, timeout, jitter, catch_up, next_run)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (job_id, cron, kind, json.dumps(payload), timeout, jitter, catch_up, next_run),
+            )
+        return job_id
+
+    def remove(self, job_id):
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,)).rowcount > 0
+
+    def jobs(self, due_before=None):
+        """Return all jobs, or only those due at or before due_before, soonest first."""
+        sql = """SELECT id, cron, kind, payload, timeout, jitter, catch_up, next_run, last_run, last_status
+            FROM jobs"""
+        args = ()
+        if due_before is not None:
+            sql += " WHERE next_run <= ?"
+            args = (due_before,)
+        with self.lock:
+            rows = self.conn.execute(sql + " ORDER BY next_run", args).fetchall()
+        keys = ("id", "cron", "kind", "payload", "timeout", "jitter", "catch_up", "next_run", "last_run",
+                "last_status")
+        return [{**dict(zip(keys, row)), "payload": json.loads(row[3])} for row in rows]
+
+    def reschedule(self, job_id, next_run):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET next_run = ? WHERE id = ?", (next_run, job_id))
+
+    def record(self, job_id, started, status, result):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET last_run = ?, last_status = ?, last_result = ? WHERE id = ?",
+                (started, status, json.dumps(result, default=str)[:10000], job_id),
+            )
+
+
+class Scheduler:
+    """Runs due jobs from a JobStore on a worker pool.
+
+    runners maps a job kind to a callable taking the job payload. A job never overlaps itself:
+    while a run is in flight (or has timed out but not yet returned, since threads cannot be
+    killed) its next due time is skipped.
+    """
+
+    def __init__(self, store, runners, max_workers=4, poll_interval=5):
+        self.store = store
+        self.runners = runners
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.poll_interval = poll_interval
+        self.running = {}  # job id -> future of its latest run
+        self.workers = {}  # job id -> thread running its latest run, outlives the future on timeout
+        self.stopped = threading.Event()
+
+    def tick(self, now=None):
+        """Start every due job and schedule its next run. Returns the ids that were started."""
+        now = time.time() if now is None else now
+        started = []
+        for job in self.store.jobs(due_before=now):
+            next_run = _next_run(job["cron"], now, job["jitter"])
+            self.store.reschedule(job["id"], next_run)
+            if now - _last_due(job, now) > job["catch_up"]:
+                # missed by more than catch_up (the scheduler was down), wait for the next slot
+                print(f"Skipping missed run of job {job['id']}, next run at {time.ctime(next_run)}")
+                continue
+            future, worker = self.running.get(job["id"]), self.workers.get(job["id"])
+            if (future is not None and not future.done()) or (worker is not None and worker.is_alive()):
+                print(f"Job {job['id']} is still running, skipping this run")
+                continue
+            self.running[job["id"]] = self.pool.submit(self._run, job, now)
+            started.append(job["id"])
+        return started
+
+    def _run(self, job, started):
+        runner = self.runners.get(job["kind"])
+        if runner is None:
+            self.store.record(job["id"], started, "error", f"no runner for job kind {job['kind']!r}")
+            return
+        # the runner gets its own thread so a hung Google or OpenAI call cannot hold the timeout hostage
+        result = {}
+        worker = threading.Thread(target=self._call, args=(runner, job["payload"], result), daemon=True)
+        self.workers[job["id"]] = worker
+        worker.start()
+        worker.join(job["timeout"])
+        if worker.is_alive():
+            status, outcome = "timeout", f"still running after {job['timeout']}s"
+            print(f"Job {job['id']} timed out after {job['timeout']}s")
+        else:
+            status, outcome = result["status"], result["value"]
+        self.store.record(job["id"], started, status, outcome)
+
+    @staticmethod
+    def _call(runner, payload, result):
+        try:
+            result.update(status="ok", value=runner(payload))
+        except Exception as error:
+            print(f"An error occurred in a scheduled job: {error!r}")
+            result.update(status="error", value=repr(error))
+
+    def run_forever(self):
+        print(f"Scheduler running {len(self.store.jobs())} jobs")
+        while not self.stopped.is_set():
+            self.tick()
+            self.stopped.wait(self.poll_interval)
+        self.pool.shutdown(wait=False)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def default_runners():
+    """Runners for saved Skills and for agent turns in persistent sessions."""
+    from context_budget import ContextWindow
+    from main import agents, attach_tools, calendar_agent, client, gmail_agent, router, run_full_turn, \
+        tool_results, triage_agent
+    from session_store import SessionStore
+    from skills import PlanExecutor, SkillStore
+
+    attach_tools()
+    skill_store = SkillStore()
+    plan_executor = PlanExecutor({**gmail_agent.compile_tools()[1], **calendar_agent.compile_tools()[1]}, client)
+    sessions = SessionStore()
+
+    def run_skill(payload):
+        skill = skill_store.load(payload["name"])
+        if skill is None:
+            raise ValueError(f"No skill named {payload['name']}")
+        result = plan_executor.run(skill, **payload.get("params", {}))
+        if "error" in result:
+            raise RuntimeError(f"step {result['failed_step']}: {result['error']}")
+        return result["answer"] or result["outputs"][-1:]
+
+    def run_turn(payload):
+        session = sessions.open(payload.get("session"), triage_agent.name)
+        agent = router.route(payload["prompt"], agents.get(session.agent_name)) or triage_agent
+        session.append([{"role": "user", "content": payload["prompt"]}], agent.name)
+        response = run_full_turn(agent, session.messages, parallel_tool_calls=True, context=ContextWindow(),
+                                 result_store=tool_results)
+        session.append(response.messages, response.agent.name)
+        return response.messages[-1].content if response.messages else None
+
+    return {"skill": run_skill, "turn": run_turn}
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="jobs.db", help="job store path")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="schedule a skill or an agent turn")
+    add.add_argument("cron", help='cron expression, e.g. "0 9 * * 1-5" or @daily')
+    add.add_argument("kind", choices=["skill", "turn"])
+    add.add_argument("target", help="skill name, or the prompt of an agent turn")
+    add.add_argument("params", nargs="*", help="param=value pairs for a skill")
+    add.add_argument("--session", help="session id for agent turns (default: one per job)")
+    add.add_argument("--timeout", type=float, default=300, help="seconds before a run is abandoned")
+    add.add_argument("--jitter", type=float, default=30, help="random delay of up to this many seconds")
+    add.add_argument("--catch-up", type=float, default=3600,
+                     help="run once on start if a run was missed by at most this many seconds")
+    remove = commands.add_parser("remove", help="delete a job")
+    remove.add_argument("job_id")
+    commands.add_parser("list", help="show jobs and their last outcome")
+    run = commands.add_parser("run", help="run the scheduler")
+    run.add_argument("--workers", type=int, default=4)
+    options = parser.parse_args(argv)
+
+    store = JobStore(options.db)
+    if options.command == "add":
+        if options.kind == "skill":
+            payload = {"name": options.target, "params": dict(param.split("=", 1) for param in options.params)}
+        else:
+            payload = {"prompt": options.target, "session": options.session or f"job-{uuid.uuid4().hex[:8]}"}
+        print(store.add(options.cron, options.kind, payload, timeout=options.timeout, jitter=options.jitter,
+                        catch_up=options.catch_up))
+    elif options.command == "remove":
+        print("removed" if store.remove(options.job_id) else "no such job")
+    elif options.command == "list":
+        for job in store.jobs():
+            print(f"{job['id']}  {job['cron']:<16} {job['kind']:<6} next {time.ctime(job['next_run'])}  "
+                  f"last {job['last_status'] or '-'}  {json.dumps(job['payload'])}")
+    else:
+        Scheduler(store, default_runners(), max_workers=options.workers).run_forever()
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
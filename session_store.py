@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+
+def _to_dict(message):
+    """ChatCompletionMessage objects are stored as the dicts the API accepts back."""
+    if hasattr(message, "model_dump"):
+        return message.model_dump(exclude_none=True)
+    return message
+
+
+class Session:
+    """One conversation: the name of its current agent and its append-only message log.
+
+    The log is read from disk the first time .messages is used, so opening a session (or
+    listing thousands of them) costs one row lookup until it is actually resumed.
+    """
+
+    def __init__(self, store, session_id, agent_name, length):
+        self.store = store
+        self.id = session_id
+        self.agent_name = agent_name
+        self.length = length
+        self._messages = None
+
+    @property
+    def messages(self):
+        if self._messages is None:
+            self._messages = self.store.load_messages(self.id)
+        return self._messages
+
+    def append(self, messages, agent_name=None):
+        """Log new messages (and the agent that will answer next) and add them to .messages."""
+        messages = [_to_dict(message) for message in messages]
+        self.store.append(self.id, messages, agent_name or self.agent_name, start=self.length)
+        self.length += len(messages)
+        if agent_name:
+            self.agent_name = agent_name
+        if self._messages is not None:
+            self._messages.extend(messages)
+
+
+class SessionStore:
+    """SQLite store of conversations that survive restarts.
+
+    Messages are only ever appended, one row each, so saving a turn writes just that turn.
+    Agents are recorded by name and resolved through a registry (see main.agents) when a session
+    is resumed, instead of being serialized along with their tool callables.
+    """
+
+    def __init__(self, path="sessions.db"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    agent TEXT,
+                    length INTEGER,
+                    created_at REAL,
+                    updated_at REAL
+                )"""
+            )
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS session_messages (
+                    session_id TEXT,
+                    seq INTEGER,
+                    message TEXT,
+                    PRIMARY KEY (session_id, seq)
+                )"""
+            )
+
+    def open(self, session_id=None, agent_name=None):
+        """Return the session with this id, creating it (with agent_name) if it does not exist."""
+        session_id = session_id or uuid.uuid4().hex
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO sessions (id, agent, length, created_at, updated_at) VALUES (?, ?, 0, ?, ?)",
+                (session_id, agent_name, now, now),
+            )
+            agent, length = self.conn.execute(
+                "SELECT agent, length FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return Session(self, session_id, agent, length)
+
+    def load_messages(self, session_id):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT message FROM session_messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def append(self, session_id, messages, agent_name, start):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO session_messages (session_id, seq, message) VALUES (?, ?, ?)",
+                [(session_id, start + i, json.dumps(message, default=str)) for i, message in enumerate(messages)],
+            )
+            self.conn.execute(
+                "UPDATE sessions SET agent = ?, length = ?, updated_at = ? WHERE id = ?",
+                (agent_name, start + len(messages), time.time(), session_id),
+            )
+
+    def sessions(self, limit=50):
+        """Return (id, agent, length, updated_at) of the most recently active sessions."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, agent, length, updated_at FROM sessions ORDER BY updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    def delete(self, session_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+            self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
@@ -1,7 +1,13 @@
 import os
+import datetime
+import threading
+import time
+import google_auth_httplib2
 # from google_auth_oauthlib.flow import Flow
+from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest, build_http
 # from config.integration.google import GoogleConfig
 # from config.conf_type import ConfType
 # from utils.initialization import configuration
@@ -27,6 +33,13 @@ def setup_google_auth():
         creds = Credentials.from_authorized_user_file("token.json", scopes)
         if creds and creds.valid:
             return creds
+        # Expired tokens are refreshed with the stored refresh token instead of re-authorizing
+        if creds and creds.refresh_token:
+            creds.refresh(Request())
+            save_credentials(creds)
+            return creds
+
+    raise RuntimeError("No usable token.json found, run google-auth.py to authorize this app first")
 
     # If not, start the OAuth flow
     # flow = Flow.from_client_config(
@@ -45,15 +58,84 @@ def setup_google_auth():
     # flow.fetch_token(code=code)
     # creds = flow.credentials
 
+
+def save_credentials(creds):
     # Save the credentials for future use
     with open("token.json", "w") as token:
         token.write(creds.to_json())
 
-    return creds
+
+class ServiceFactory:
+    """Builds Google API clients that can be shared across threads and stay authorized.
+
+    Discovery documents come from the copies bundled with google-api-python-client
+    (static_discovery), so building a service never touches the network, and each service is built
+    once per factory. httplib2 transports are not thread-safe, so every request is bound to an
+    authorized transport owned by the calling thread and reused for that thread's later requests.
+    Credentials are refreshed refresh_margin before they expire, by a background thread and as a
+    fallback before each request, so the first call after an idle period does not pay for it.
+    """
+
+    def __init__(self, creds, refresh_margin=datetime.timedelta(minutes=5)):
+        self.creds = creds
+        self.refresh_margin = refresh_margin
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.services = {}
+
+    def build(self, service_name, version):
+        with self.lock:
+            if (service_name, version) not in self.services:
+                self.services[(service_name, version)] = build(
+                    service_name, version, credentials=self.creds, requestBuilder=self.build_request,
+                    static_discovery=True, cache_discovery=False,
+                )
+            return self.services[(service_name, version)]
+
+    def build_request(self, http, *args, **kwargs):
+        # the shared http passed in by the client library is ignored in favour of this thread's own
+        self.ensure_fresh()
+        return HttpRequest(self.thread_http(), *args, **kwargs)
+
+    def thread_http(self):
+        http = getattr(self.local, "http", None)
+        if http is None:
+            http = self.local.http = google_auth_httplib2.AuthorizedHttp(self.creds, http=build_http())
+        return http
+
+    def needs_refresh(self):
+        if self.creds.expiry is None:
+            return not self.creds.valid
+        return self.creds.expiry - datetime.datetime.utcnow() < self.refresh_margin
+
+    def ensure_fresh(self):
+        if not self.needs_refresh():
+            return
+        with self.lock:
+            if self.needs_refresh():  # another thread may have refreshed while we waited
+                self.creds.refresh(Request())
+                save_credentials(self.creds)
+
+    def start_refresh_thread(self):
+        threading.Thread(target=self._refresh_loop, name="google-credentials-refresh", daemon=True).start()
+
+    def _refresh_loop(self):
+        while True:
+            if self.creds.expiry is None:
+                delay = 60
+            else:
+                due = self.creds.expiry - self.refresh_margin - datetime.datetime.utcnow()
+                delay = max(due.total_seconds(), 30)
+            time.sleep(delay)
+            try:
+                self.ensure_fresh()
+            except Exception as e:
+                print(f"Failed to refresh Google credentials: {e}")
 
 
 def initialize_services():
-    creds = setup_google_auth()
-    gmail_service = build("gmail", "v1", credentials=creds)
-    calendar_service = build("calendar", "v3", credentials=creds)
+    factory = ServiceFactory(setup_google_auth())
+    factory.start_refresh_thread()
+    gmail_service = factory.build("gmail", "v1")
+    calendar_service = factory.build("calendar", "v3")
     return gmail_service, calendar_service
@@ -0,0 +1,269 @@
+"""Skills: successful agent runs saved as deterministic plans and replayed without the model.
+
+compile_skill() turns the messages of a run into a plan of tool steps. Argument values equal to
+one of the skill's params become {"$param": name} (or a {"$template": ...} string when the value
+is embedded in a longer string), and values that came out of an earlier step's result become
+{"$ref": [step, key, ...]}, so the plan replays on new inputs. Steps marked as needing judgment
+are the only ones that go back to the model: a tool step whose arguments the model picks, or a
+text step such as the final answer.
+"""
+from tool_results import project
+from tool_schema import decode_arguments, function_to_schema
+import json
+import os
+import re
+
+# tools that only steer the conversation, there is nothing to replay
+IGNORED_TOOLS = {"read_tool_result"}
+JUDGMENT_SYSTEM_PROMPT = (
+    "You are running one step of a saved workflow. Work only from the step results provided "
+    "and answer concisely."
+)
+
+
+def _get(message, key):
+    if isinstance(message, dict):
+        return message.get(key)
+    return getattr(message, key, None)
+
+
+def _call_parts(tool_call):
+    function = _get(tool_call, "function")
+    return _get(tool_call, "id"), _get(function, "name"), _get(function, "arguments")
+
+
+_UNPARSED = object()
+_RESULT_REF = re.compile(r'read_tool_result\(ref="([^"]+)"\)')
+
+
+def _parse(content):
+    try:
+        return json.loads(content)
+    except (TypeError, ValueError):
+        return content
+
+
+def _raw_output(content, result_store):
+    """The tool's own return value behind a tool message, or _UNPARSED if it cannot be recovered.
+
+    Compacted messages are projected and cut, so their full payload is read back from the result
+    store through the ref in the compaction note; paths must be found in the shape the tools return.
+    """
+    match = _RESULT_REF.search(content or "")
+    if match:
+        content = result_store.payload(match.group(1)) if result_store is not None else None
+    if content is None:
+        return _UNPARSED
+    try:
+        return json.loads(content)
+    except ValueError:
+        return content  # a plain string result, e.g. an error message
+
+
+def _find(value, data, path=()):
+    """Return the path to the first occurrence of value inside data, or None."""
+    if data == value:
+        return list(path)
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list):
+        items = enumerate(data)
+    else:
+        return None
+    for key, item in items:
+        found = _find(value, item, path + (key,))
+        if found is not None:
+            return found
+    return None
+
+
+def _parameterize(value, params, outputs, unparsed=()):
+    if isinstance(value, dict):
+        return {key: _parameterize(item, params, outputs, unparsed) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_parameterize(item, params, outputs, unparsed) for item in value]
+    for name, example in params.items():
+        if value == example:
+            return {"$param": name}
+    if isinstance(value, str):
+        embedded = [(name, example) for name, example in params.items()
+                    if isinstance(example, str) and len(example) >= 3 and example in value]
+        if embedded:
+            template = value.replace("{", "{{").replace("}", "}}")
+            for name, example in embedded:
+                template = template.replace(example, "{" + name + "}")
+            return {"$template": template}
+        if len(value) >= 4:  # ids and addresses, short strings match too much by accident
+            for step in range(len(outputs) - 1, -1, -1):
+                path = _find(value, outputs[step])
+                if path is not None:
+                    return {"$ref": [step] + path}
+            for step, content in unparsed:
+                # freezing it would replay this run's data on every run; when the result was cut,
+                # any identifier-like value may have come from the part that is gone
+                cut = "[compacted from" in content and not any(char.isspace() for char in value)
+                if value in content or cut:
+                    raise ValueError(f"{value!r} comes from the result of step {step}, which could not be "
+                                     f"recovered to reference it")
+    return value
+
+
+def compile_skill(name, messages, params=None, judgment=None, description=None, result_store=None):
+    """Compile the messages of a successful run into a skill plan (a JSON-serializable dict).
+
+    params maps parameter names to the values used in this run, e.g. {"query": "invoice"}.
+    judgment maps step indexes to instructions for tool steps whose arguments the model should
+    choose on every run. A run that ended with a text answer gets a final judgment step that
+    writes that answer from the step results. result_store is the ToolResultStore that compacted
+    the run's tool messages, used to read their full payloads back. Raises ValueError when an
+    argument comes from a result that cannot be recovered.
+    """
+    params = params or {}
+    judgment = judgment or {}
+    request = next((_get(message, "content") for message in messages if _get(message, "role") == "user"), "")
+    results = {_get(message, "tool_call_id"): _get(message, "content")
+               for message in messages if _get(message, "role") == "tool"}
+
+    steps = []
+    outputs = []
+    unparsed = []  # (step, message content) of results that could not be recovered
+    answer = None
+    for message in messages:
+        if _get(message, "role") != "assistant":
+            continue
+        if not _get(message, "tool_calls"):
+            answer = _get(message, "content") or answer
+            continue
+        for tool_call in _get(message, "tool_calls"):
+            call_id, tool, arguments = _call_parts(tool_call)
+            if tool in IGNORED_TOOLS or tool.startswith("transfer_to_"):
+                continue
+            step = {"tool": tool, "args": _parameterize(_parse(arguments) or {}, params, outputs, unparsed)}
+            if len(steps) in judgment:
+                step["judgment"] = judgment[len(steps)]
+            output = _raw_output(results.get(call_id), result_store)
+            if output is _UNPARSED:
+                unparsed.append((len(steps), results.get(call_id) or ""))
+                output = None
+            steps.append(step)
+            outputs.append(output)
+
+    if answer is not None:
+        steps.append({"judgment": _parameterize(request, params, [])})
+    return {"name": name, "description": description or request, "params": params, "steps": steps}
+
+
+def resolve(value, params, outputs):
+    """Substitute $param, $template and $ref markers in a plan value."""
+    if isinstance(value, list):
+        return [resolve(item, params, outputs) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "$param" in value:
+        return params[value["$param"]]
+    if "$template" in value:
+        return value["$template"].format(**params)
+    if "$ref" in value:
+        data = outputs[value["$ref"][0]]
+        for key in value["$ref"][1:]:
+            data = data[key]
+        return data
+    return {key: resolve(item, params, outputs) for key, item in value.items()}
+
+
+class SkillStore:
+    """Saved skills, one JSON file per skill so plans can be read and edited by hand."""
+
+    def __init__(self, directory="skills"):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, re.sub(r"[^\w-]+", "_", name) + ".json")
+
+    def save(self, skill):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(skill["name"]), "w") as file:
+            json.dump(skill, file, indent=2, default=str)
+
+    def load(self, name):
+        try:
+            with open(self._path(name)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def names(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(file[:-5] for file in os.listdir(self.directory) if file.endswith(".json"))
+
+
+class PlanExecutor:
+    """Replays skill plans directly against the agents' tools.
+
+    tools maps tool names to callables (e.g. the merged tool maps of the Gmail and Calendar
+    agents). Arguments go through the same validation as model tool calls. Only judgment steps
+    call the model, through client (an OpenAI client), everything else is local.
+    """
+
+    def __init__(self, tools, client=None, model="gpt-4o-mini", max_context_chars=12000):
+        self.tools = tools
+        self.client = client
+        self.model = model
+        self.max_context_chars = max_context_chars
+
+    def run(self, skill, **params):
+        """Run every step of skill and return {'outputs': [...], 'answer': text or None}.
+
+        Params that are not given keep the values of the recorded run. A failing step stops the
+        run and is reported as {'failed_step': index, 'error': ...}.
+        """
+        params = {**skill["params"], **params}
+
+        outputs = []
+        answer = None
+        for index, step in enumerate(skill["steps"]):
+            try:
+                if "tool" not in step:
+                    answer = self._judge(resolve(step["judgment"], params, outputs), outputs)
+                    outputs.append(answer)
+                    continue
+                tool = self.tools[step["tool"]]
+                if "judgment" in step:
+                    args = self._choose_arguments(tool, resolve(step["judgment"], params, outputs), outputs)
+                else:
+                    args = decode_arguments(tool, json.dumps(resolve(step["args"], params, outputs), default=str))
+                print(f"Skill {skill['name']}:", f"{step['tool']}({args})")
+                outputs.append(tool(**args))
+            except (KeyError, IndexError, TypeError, ValueError) as error:
+                print(f"Skill {skill['name']} failed at step {index}: {error!r}")
+                return {"outputs": outputs, "answer": answer, "failed_step": index, "error": repr(error)}
+        return {"outputs": outputs, "answer": answer}
+
+    def _context(self, outputs):
+        text = json.dumps([project(output) for output in outputs], default=str)
+        return text[:self.max_context_chars]
+
+    def _judge(self, instructions, outputs):
+        if self.client is None:
+            raise ValueError("judgment steps need an OpenAI client")
+        response = self.client.chat.completions.create(model=self.model, messages=[
+            {"role": "system", "content": JUDGMENT_SYSTEM_PROMPT},
+            {"role": "user", "content": f"{instructions}\n\nStep results:\n{self._context(outputs)}"},
+        ])
+        return response.choices[0].message.content
+
+    def _choose_arguments(self, tool, instructions, outputs):
+        if self.client is None:
+            raise ValueError("judgment steps need an OpenAI client")
+        schema = function_to_schema(tool)
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": JUDGMENT_SYSTEM_PROMPT},
+                {"role": "user", "content": f"{instructions}\n\nStep results:\n{self._context(outputs)}"},
+            ],
+            tools=[schema],
+            tool_choice={"type": "function", "function": {"name": schema["function"]["name"]}},
+        )
+        return decode_arguments(tool, response.choices[0].message.tool_calls[0].function.arguments)
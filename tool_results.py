@@ -0,0 +1,103 @@
+from collections import OrderedDict
+import itertools
+import json
+import threading
+
+
+def _event_time(value):
+    if not isinstance(value, dict):
+        return value
+    return value.get('dateTime') or value.get('date')
+
+
+def project(result):
+    """Reduce known Gmail/Calendar payloads to the fields the model needs.
+
+    Message listings keep id, thread, subject, sender and a short snippet of the body; a single
+    message keeps its body. Calendar events keep id, summary, start/end, location and attendees.
+    Anything else is returned unchanged.
+    """
+    if isinstance(result, list):
+        return [_project_item(item, in_listing=True) for item in result]
+    return _project_item(result, in_listing=False)
+
+
+def _project_item(item, in_listing):
+    if not isinstance(item, dict):
+        return item
+    if 'sender' in item and 'subject' in item:  # parsed Gmail message
+        projected = {key: item[key] for key in ('id', 'threadId', 'subject', 'sender', 'date') if item.get(key)}
+        if in_listing or 'body' not in item:  # metadata-only messages carry Gmail's snippet instead of a body
+            projected['snippet'] = item.get('snippet') or (item.get('body') or '')[:200]
+        else:
+            projected['body'] = item.get('body')
+        return projected
+    if item.get('kind') == 'calendar#event' or ('start' in item and 'end' in item):
+        projected = {
+            'id': item.get('id'),
+            'summary': item.get('summary'),
+            'start': _event_time(item.get('start')),
+            'end': _event_time(item.get('end')),
+        }
+        if item.get('location'):
+            projected['location'] = item['location']
+        if item.get('attendees'):
+            projected['attendees'] = [attendee.get('email') for attendee in item['attendees']]
+        return projected
+    return item
+
+
+class ToolResultStore:
+    """Turns tool results into compact prompt text and keeps the full payloads on the side.
+
+    Results are projected with project() and capped at max_chars (or limits[tool_name]). When
+    anything was dropped, the full JSON is kept under a ref that the model can page through with
+    the read_tool_result tool. Only the most recent max_entries payloads are retained.
+    """
+
+    def __init__(self, max_chars=4000, limits=None, max_entries=100):
+        self.max_chars = max_chars
+        self.limits = limits or {}
+        self.max_entries = max_entries
+        self.payloads = OrderedDict()
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def compact(self, tool_name, result):
+        if tool_name == 'read_tool_result':  # already paged, compacting it again would loop
+            return result
+        full = result if isinstance(result, str) else json.dumps(result, default=str)
+        projected = project(result)
+        text = projected if isinstance(projected, str) else json.dumps(projected, default=str)
+        limit = self.limits.get(tool_name, self.max_chars)
+        if text == full and len(text) <= limit:
+            return text
+
+        ref = f"{tool_name}-{next(self._ids)}"
+        with self.lock:
+            self.payloads[ref] = full
+            while len(self.payloads) > self.max_entries:
+                self.payloads.popitem(last=False)
+
+        if len(text) > limit:
+            text = text[:limit] + '...'
+        return (f"{text}\n[compacted from {len(full)} chars; call read_tool_result(ref=\"{ref}\") "
+                f"to read the full result]")
+
+    def payload(self, ref):
+        """The full JSON of a compacted result, or None once it has been evicted."""
+        with self.lock:
+            return self.payloads.get(ref)
+
+    def read_tool_result(self, ref: str, offset: int = 0, length: int = 4000):
+        """Read the full payload of an earlier compacted tool result, `length` characters at a time
+        starting at `offset`."""
+        with self.lock:
+            full = self.payloads.get(ref)
+        if full is None:
+            return f"No stored tool result named {ref}."
+        offset, length = int(offset), int(length)
+        chunk = full[offset:offset + length]
+        if offset + length < len(full):
+            chunk += f"\n[{len(full) - offset - length} more chars, continue with offset={offset + length}]"
+        return chunk
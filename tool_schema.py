@@ -0,0 +1,187 @@
+from pydantic import AfterValidator, BaseModel, ConfigDict, ValidationError, WithJsonSchema, create_model
+from typing import Annotated, Any, Literal, Union, get_args, get_origin
+import collections.abc
+import datetime
+import inspect
+import types
+
+type_map = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+    type(None): "null",
+}
+
+# schemas and validators are memoized per underlying function, see _cache_key
+_schema_cache = {}
+_validator_cache = {}
+
+
+def _cache_key(func):
+    """Key bound methods by their function, not (instance, function).
+
+    A bound method key would keep its instance, and whatever connections it holds, alive for the
+    life of the process; every instance of a tool class has the same signature anyway.
+    """
+    if inspect.ismethod(func):
+        return func.__func__, True
+    return func, False
+
+
+def _check_datetime(value):
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        parsed = None
+    if parsed is None or len(value) <= 10:  # a bare date has no time of day
+        raise ValueError(f"expected an ISO 8601 datetime such as 2024-05-01T14:00:00, got {value!r}")
+    return parsed.isoformat()
+
+
+# a str parameter that must hold an ISO 8601 datetime, normalized to isoformat() before the tool runs
+IsoDateTime = Annotated[str, AfterValidator(_check_datetime), WithJsonSchema({"type": "string", "format": "date-time"})]
+
+
+def annotation_to_schema(annotation, defs) -> dict:
+    """Translate a parameter annotation into a JSON schema fragment.
+
+    Unannotated and unrecognised parameters fall back to "string". Definitions of nested pydantic
+    models are collected into defs so they can be hoisted to the top of the parameters schema.
+    """
+    if annotation is inspect.Parameter.empty:
+        return {"type": "string"}
+    if annotation in type_map:
+        return {"type": type_map[annotation]}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        schema = annotation.model_json_schema(ref_template="#/$defs/{model}")
+        defs.update(schema.pop("$defs", {}))
+        return schema
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Annotated:
+        for metadata in annotation.__metadata__:
+            if isinstance(metadata, WithJsonSchema):
+                return dict(metadata.json_schema)
+        return annotation_to_schema(args[0], defs)
+    if origin is Literal:
+        schema = {"enum": list(args)}
+        value_types = {type_map.get(type(arg)) for arg in args}
+        if len(value_types) == 1 and None not in value_types:
+            schema["type"] = value_types.pop()
+        return schema
+    if origin in (Union, types.UnionType):
+        # Optional[X] is described as X, optionality comes from the parameter default
+        options = [arg for arg in args if arg is not type(None)]
+        if len(options) == 1:
+            return annotation_to_schema(options[0], defs)
+        return {"anyOf": [annotation_to_schema(arg, defs) for arg in options]}
+    if origin in (list, tuple, set, frozenset, collections.abc.Sequence, collections.abc.Iterable):
+        schema = {"type": "array"}
+        if args and args[0] is not Ellipsis:
+            schema["items"] = annotation_to_schema(args[0], defs)
+        return schema
+    if origin in (dict, collections.abc.Mapping):
+        return {"type": "object"}
+    return {"type": "string"}
+
+
+def function_to_schema(func) -> dict:
+    try:
+        return _schema_cache[_cache_key(func)]
+    except (KeyError, TypeError):
+        pass
+
+    try:
+        signature = inspect.signature(func, eval_str=True)
+    except (ValueError, NameError) as e:
+        raise ValueError(
+            f"Failed to get signature for function {func.__name__}: {str(e)}"
+        )
+
+    defs = {}
+    parameters = {
+        param.name: annotation_to_schema(param.annotation, defs)
+        for param in signature.parameters.values()
+    }
+
+    required = [
+        param.name
+        for param in signature.parameters.values()
+        if param.default == inspect._empty
+    ]
+
+    schema = {
+        "type": "function",
+        "function": {
+            "name": func.__name__,
+            "description": (func.__doc__ or "").strip(),
+            "parameters": {
+                "type": "object",
+                "properties": parameters,
+                "required": required,
+            },
+        },
+    }
+    if defs:
+        schema["function"]["parameters"]["$defs"] = defs
+
+    try:
+        _schema_cache[_cache_key(func)] = schema
+    except TypeError:  # unhashable callables are simply not memoized
+        pass
+    return schema
+
+
+def function_to_validator(func):
+    """Return a pydantic model validating func's arguments, built once per tool.
+
+    Annotated parameters are checked and coerced (e.g. "5" -> 5 for an int), unannotated ones are
+    accepted as they are. Unknown arguments are rejected unless func takes **kwargs.
+    """
+    try:
+        return _validator_cache[_cache_key(func)]
+    except (KeyError, TypeError):
+        pass
+
+    signature = inspect.signature(func, eval_str=True)
+    fields = {}
+    extra = "forbid"
+    for param in signature.parameters.values():
+        if param.kind is param.VAR_KEYWORD:
+            extra = "allow"
+            continue
+        if param.kind is param.VAR_POSITIONAL:
+            continue
+        annotation = Any if param.annotation is inspect.Parameter.empty else param.annotation
+        default = ... if param.default is inspect.Parameter.empty else param.default
+        fields[param.name] = (annotation, default)
+
+    validator = create_model(f"{func.__name__}_arguments", __config__=ConfigDict(extra=extra), **fields)
+    try:
+        _validator_cache[_cache_key(func)] = validator
+    except TypeError:
+        pass
+    return validator
+
+
+def decode_arguments(func, arguments):
+    """Parse and validate a tool call's JSON arguments for func, returning the kwargs to call it with.
+
+    Raises ValueError with a short, model-readable description of every problem.
+    """
+    try:
+        validated = function_to_validator(func).model_validate_json(arguments or "{}")
+    except ValidationError as error:
+        problems = "; ".join(
+            f"{'.'.join(str(part) for part in problem['loc']) or 'arguments'}: {problem['msg']}"
+            for problem in error.errors(include_url=False)
+        )
+        raise ValueError(f"Invalid arguments for {func.__name__}: {problems}") from None
+    # only what the model passed, so the tool's own defaults still apply to the rest
+    kwargs = {name: getattr(validated, name) for name in validated.model_fields_set}
+    kwargs.update(validated.model_extra or {})
+    return kwargs
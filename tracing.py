@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+import contextvars
+import json
+import os
+import threading
+import time
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "error", "otel_span")
+
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = time.time()
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+        self.otel_span = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self):
+        return ((self.end or time.time()) - self.start) * 1000
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for both the span and its context manager when tracing is off."""
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class JsonlExporter:
+    """Appends one JSON object per finished span to path."""
+
+    def __init__(self, path):
+        self.file = open(path, "a", buffering=1)
+        self.lock = threading.Lock()
+
+    def on_start(self, span):
+        pass
+
+    def on_end(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+
+
+class OpenTelemetryExporter:
+    """Mirrors spans onto the globally configured OpenTelemetry tracer provider.
+
+    Needs the opentelemetry-api package; install and configure the SDK (provider, processor,
+    OTLP exporter) as usual and the agent spans show up alongside everything else.
+    """
+
+    def __init__(self, name="open-agent"):
+        if otel_trace is None:
+            raise ImportError("OpenTelemetryExporter requires the opentelemetry-api package")
+        self.tracer = otel_trace.get_tracer(name)
+
+    def on_start(self, span):
+        parent = _current_span.get()
+        context = None
+        if parent is not None and parent.otel_span is not None:
+            context = otel_trace.set_span_in_context(parent.otel_span)
+        span.otel_span = self.tracer.start_span(span.name, context=context, start_time=int(span.start * 1e9))
+
+    def on_end(self, span):
+        otel_span = span.otel_span
+        for key, value in span.attributes.items():
+            if value is not None:
+                otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        if span.error:
+            otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int(span.end * 1e9))
+
+
+class Tracer:
+    """Records nested spans for model calls, tool calls, Google requests and agent handoffs.
+
+    Without exporters span() hands back a shared no-op, so instrumentation costs one attribute
+    check when tracing is off. The current span is tracked in a contextvar; work submitted to
+    thread pools should run inside contextvars.copy_context() to stay under its parent.
+    """
+
+    def __init__(self, exporters=()):
+        self.exporters = list(exporters)
+
+    @property
+    def enabled(self):
+        return bool(self.exporters)
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    @contextmanager
+    def _span(self, name, attributes):
+        span = Span(name, _current_span.get(), attributes)
+        for exporter in self.exporters:
+            exporter.on_start(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as error:
+            span.error = f"{type(error).__name__}: {error}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end = time.time()
+            for exporter in self.exporters:
+                exporter.on_end(span)
+
+    def span(self, name, **attributes):
+        if not self.exporters:
+            return _NOOP_SPAN
+        return self._span(name, attributes)
+
+
+tracer = Tracer()
+
+
+def configure(jsonl_path=None, opentelemetry=False):
+    """Enable tracing to a JSONL file and/or the OpenTelemetry API."""
+    if jsonl_path:
+        tracer.add_exporter(JsonlExporter(jsonl_path))
+    if opentelemetry:
+        tracer.add_exporter(OpenTelemetryExporter())